@@ -60,7 +60,10 @@ def root():
             "ping": "/ping",
             "submit_task": "/submit_remove_task",
             "get_results": "/get_results",
+            "stream_results": "/stream_results",
             "download": "/download/{task_id}",
+            "tasks": "/tasks",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -180,6 +180,9 @@ def main():
 
                     except Exception as e:
                         st.error(f"❌ Error processing video: {str(e)}")
+                    finally:
+                        # the chunk workers hold their own models, free them between jobs
+                        st.session_state.sora_wm.close()
             
             # Download button (show only if video is processed)
             if "processed_video_data" in st.session_state:
@@ -295,6 +298,8 @@ def main():
                         st.error(f"❌ Error processing videos: {str(e)}")
                         import traceback
                         st.error(f"Details: {traceback.format_exc()}")
+                    finally:
+                        st.session_state.sora_wm.close()
             
             # Show download buttons for processed files
             if "batch_processed_files" in st.session_state and st.session_state.batch_processed_files:
@@ -350,6 +350,7 @@ def main():
             console.print()
 
     # Create processor and run
+    processor = None
     try:
         processor = BatchProcessorImpl(input_folder, output_folder, pattern)
         processor.process_batch()
@@ -364,6 +365,10 @@ def main():
         console.print()
         console.print(f"[bold red]❌ Fatal error:[/bold red] {e}")
         sys.exit(1)
+    finally:
+        # stop the chunk worker processes and the models they hold
+        if processor is not None:
+            processor.sora_wm.close()
 
 
 if __name__ == "__main__":
@@ -3,7 +3,13 @@ from pathlib import Path
 import cv2
 from tqdm import tqdm
 from sorawm.watermark_detector import SoraWaterMarkDetector
-from sorawm.configs import ROOT
+from sorawm.configs import DETECTION_CACHE, ROOT
+from sorawm.utils.detection_cache import (
+    detection_cache_key,
+    detection_params,
+    load_detections,
+)
+from sorawm.utils.media_info import probe_media
 
 videos_dir = ROOT / "videos"
 datasets_dir = ROOT / "datasets"
@@ -28,6 +34,17 @@ if __name__ == "__main__":
             continue
 
         frame_count = 0
+        # dense detections SoraWM.run already stored for this clip, if any
+        cached_track = None
+        if DETECTION_CACHE:
+            cached_track = load_detections(
+                detection_cache_key(
+                    video_path,
+                    0,
+                    probe_media(video_path).total_frames,
+                    detection_params(1),
+                )
+            )
 
         try:
             while True:
@@ -39,7 +56,11 @@ if __name__ == "__main__":
 
                 # Save frame at the specified interval
                 if frame_count % fps_save_interval == 0:
-                    if not detector.detect(frame)["detected"]:
+                    if cached_track is not None and frame_count < len(cached_track):
+                        detected = bool(cached_track.valid[frame_count])
+                    else:
+                        detected = detector.detect(frame)["detected"]
+                    if not detected:
                         # Create filename: image_idx_framecount.jpg
                         image_filename = f"{video_name}_failed_image_frame_{frame_count:06d}.jpg"
                         image_path = images_dir / image_filename
@@ -5,5 +5,5 @@ from sorawm.core import SoraWM
 if __name__ == "__main__":
     input_video_path = Path("resources/dog_vs_sam.mp4")
     output_video_path = Path("outputs/sora_watermark_removed.mp4")
-    sora_wm = SoraWM()
-    sora_wm.run(input_video_path, output_video_path)
+    with SoraWM() as sora_wm:
+        sora_wm.run(input_video_path, output_video_path)
@@ -29,9 +29,78 @@ OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
 
 DEFAULT_WATERMARK_REMOVE_MODEL = "lama"
 
+# Region-only inpainting: run LaMa on a context window around the watermark bbox
+# instead of the whole frame. Much faster, but the output differs from the
+# full-frame fill, so it is opt-in
+ROI_CLEAN = os.getenv("ROI_CLEAN", "false").lower() in ("1", "true", "yes")
+# Pixels of context kept around the watermark bbox for region-only inpainting
+ROI_CONTEXT_MARGIN = int(os.getenv("ROI_CONTEXT_MARGIN", "128"))
+
+# Temporal reuse: a watermark crop whose context differs from the last inpainted
+# one by at most this mean absolute difference (0-255) reuses its fill
+TEMPORAL_REUSE_THRESHOLD = float(os.getenv("TEMPORAL_REUSE_THRESHOLD", "2.0"))
+TEMPORAL_REUSE_MAX_FRAMES = int(os.getenv("TEMPORAL_REUSE_MAX_FRAMES", "30"))
+
+# Number of frames sent to the YOLO detector per forward call
+DETECT_BATCH_SIZE = int(os.getenv("DETECT_BATCH_SIZE", "8"))
+
+# Sparse detection: run YOLO every DETECT_INTERVAL frames and on scene changes,
+# the frames in between are only re-detected when the bbox center moves more
+# than DETECT_JUMP_THRESHOLD pixels between two keyframes. 1 detects every frame.
+DETECT_INTERVAL = int(os.getenv("DETECT_INTERVAL", "1"))
+DETECT_JUMP_THRESHOLD = float(os.getenv("DETECT_JUMP_THRESHOLD", "16"))
+SCENE_CHANGE_THRESHOLD = float(os.getenv("SCENE_CHANGE_THRESHOLD", "30"))
+
+# Change-point engine used to fill frames without a detection: "kernel"
+# (ruptures RBF, quadratic), "pelt" (linear L2), "jump" (center jumps larger
+# than IMPUTATION_JUMP_THRESHOLD pixels) or "auto" (kernel up to
+# IMPUTATION_KERNEL_MAX_FRAMES frames, pelt beyond)
+IMPUTATION_ENGINE = os.getenv("IMPUTATION_ENGINE", "auto")
+IMPUTATION_PENALTY = float(os.getenv("IMPUTATION_PENALTY", "10"))
+IMPUTATION_JUMP_THRESHOLD = float(os.getenv("IMPUTATION_JUMP_THRESHOLD", "32"))
+IMPUTATION_KERNEL_MAX_FRAMES = int(os.getenv("IMPUTATION_KERNEL_MAX_FRAMES", "2000"))
+
+# Online imputation: fill missed detections causally from center jumps, so the
+# clean pass runs at most IMPUTATION_LOOKAHEAD frames behind detection instead
+# of waiting for the whole video to be detected
+ONLINE_IMPUTATION = os.getenv("ONLINE_IMPUTATION", "false").lower() in ("1", "true", "yes")
+IMPUTATION_LOOKAHEAD = int(os.getenv("IMPUTATION_LOOKAHEAD", "200"))
+
+# Number of frames inpainted per LaMa forward call
+CLEAN_BATCH_SIZE = int(os.getenv("CLEAN_BATCH_SIZE", "4"))
+
+# Chunk-parallel mode: number of worker processes a single video is split
+# across (each loads its own models), and the shortest chunk worth a worker
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "1"))
+CHUNK_MIN_SECONDS = float(os.getenv("CHUNK_MIN_SECONDS", "2"))
+
+# Output encoder: "default", "throughput", "archival", "auto" or a libx264
+# preset name (ultrafast ... medium), see sorawm.utils.encoder_utils
+ENCODER_PROFILE = os.getenv("ENCODER_PROFILE", "default")
+ENCODER_THREADS = int(os.getenv("ENCODER_THREADS", "0")) or None
+
+# Number of probed files whose ffprobe metadata is kept in memory
+MEDIA_INFO_CACHE_SIZE = int(os.getenv("MEDIA_INFO_CACHE_SIZE", "256"))
+
+# Items buffered between two stages of the decode/detect/inpaint/encode pipeline
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
 WORKING_DIR = ROOT / "working_dir"
 WORKING_DIR.mkdir(exist_ok=True, parents=True)
 
+# Resumable jobs encode their output in segments of this length (capped to what
+# fits the frame store RAM budget), and a retry only re-encodes the segments that
+# were not finished. Off by default (0): segments cost a concat remux per job
+CHECKPOINT_DIR = WORKING_DIR / "checkpoints"
+CHECKPOINT_SEGMENT_SECONDS = float(os.getenv("CHECKPOINT_SEGMENT_SECONDS", "0"))
+
+# Scratch space for decoded frames that spill out of the in-memory frame store
+SCRATCH_DIR = WORKING_DIR / "scratch"
+FRAME_STORE_MAX_RAM_MB = int(os.getenv("FRAME_STORE_MAX_RAM_MB", "1024"))
+# Longest spill of a single-decode run, longer videos are decoded a second time
+# for the clean pass instead
+FRAME_STORE_MAX_DISK_MB = int(os.getenv("FRAME_STORE_MAX_DISK_MB", "4096"))
+
 LOGS_PATH = ROOT / "logs"
 LOGS_PATH.mkdir(exist_ok=True, parents=True)
 
@@ -39,3 +108,50 @@ DATA_PATH = ROOT / "data"
 DATA_PATH.mkdir(exist_ok=True, parents=True)
 
 SQLITE_PATH = DATA_PATH / "db.sqlite3"
+
+# SQLite connection settings: WAL lets status reads run alongside the worker's
+# writes, synchronous=NORMAL only fsyncs at checkpoints in WAL mode, and a busy
+# connection waits SQLITE_BUSY_TIMEOUT_MS before failing with "database is locked"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "5"))
+
+# Task server worker pool: SERVER_WORKER_SLOTS tasks run at once, each slot with
+# its own models, spread round-robin over SERVER_DEVICES (comma separated torch
+# devices, e.g. "cuda:0,cuda:1", empty picks the best available device).
+# SERVER_DEVICE_CONCURRENCY caps the tasks running on one device, 0 = its slots
+SERVER_WORKER_SLOTS = int(os.getenv("SERVER_WORKER_SLOTS", "1"))
+SERVER_DEVICES = [d.strip() for d in os.getenv("SERVER_DEVICES", "").split(",") if d.strip()]
+SERVER_DEVICE_CONCURRENCY = int(os.getenv("SERVER_DEVICE_CONCURRENCY", "0"))
+
+# Uploads are parsed and written to disk as the request body arrives, and cut off
+# once the video grows past MAX_UPLOAD_MB
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "2048"))
+
+# An upload identical to an earlier one (same content and output settings) reuses
+# its finished or in-flight task. Finished outputs, together with their uploaded
+# source videos, are evicted least recently used first once they take more than
+# OUTPUT_CACHE_MAX_GB (0 = unbounded)
+UPLOAD_DEDUP = os.getenv("UPLOAD_DEDUP", "true").lower() in ("1", "true", "yes")
+OUTPUT_CACHE_MAX_GB = float(os.getenv("OUTPUT_CACHE_MAX_GB", "20"))
+
+# Progress of running tasks is served from memory and written to the database
+# at most once per PROGRESS_FLUSH_SECONDS, for the tasks whose percentage changed
+PROGRESS_FLUSH_SECONDS = float(os.getenv("PROGRESS_FLUSH_SECONDS", "1.0"))
+
+# Durable queue: queued tasks live in the tasks table and a slot claims one with
+# a lease of TASK_LEASE_SECONDS, renewed every TASK_HEARTBEAT_SECONDS while it
+# runs. Leases of a crashed process expire and the task is claimed again. Idle
+# slots look for new tasks every QUEUE_POLL_SECONDS
+TASK_LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", "60"))
+TASK_HEARTBEAT_SECONDS = float(os.getenv("TASK_HEARTBEAT_SECONDS", "15"))
+QUEUE_POLL_SECONDS = float(os.getenv("QUEUE_POLL_SECONDS", "1"))
+
+# Idle progress streams send a comment this often so proxies keep them open
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# Per-frame detection results keyed by video content, detector weights and
+# detection parameters, so retries and re-runs skip YOLO
+DETECTION_CACHE = os.getenv("DETECTION_CACHE", "true").lower() in ("1", "true", "yes")
+DETECTION_CACHE_DIR = DATA_PATH / "detection_cache"
@@ -1,30 +1,153 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Callable
+from typing import Callable, List, Tuple
+import multiprocessing
+import os
 import threading
 import queue as queue_module
+import tempfile
 import time
-import shutil
 
 import ffmpeg
 import numpy as np
 from loguru import logger
 from tqdm import tqdm
 
-from sorawm.utils.video_utils import VideoLoader
+from sorawm.configs import (
+    CHECKPOINT_SEGMENT_SECONDS,
+    CHUNK_MIN_SECONDS,
+    CHUNK_WORKERS,
+    CLEAN_BATCH_SIZE,
+    DETECT_BATCH_SIZE,
+    DETECTION_CACHE,
+    DETECT_INTERVAL,
+    ENCODER_PROFILE,
+    ENCODER_THREADS,
+    FRAME_STORE_MAX_RAM_MB,
+    IMPUTATION_ENGINE,
+    IMPUTATION_LOOKAHEAD,
+    ONLINE_IMPUTATION,
+    PIPELINE_QUEUE_SIZE,
+    ROI_CLEAN,
+    SCRATCH_DIR,
+)
+from sorawm.utils.bbox_track import BBoxTrack
+from sorawm.utils.detection_cache import (
+    detection_cache_key,
+    detection_params,
+    file_sha256,
+    load_detections,
+    save_detections,
+)
+from sorawm.utils.encoder_utils import (
+    EncoderProfile,
+    build_audio_kwargs,
+    build_encoder_kwargs,
+    get_encoder_profile,
+    select_auto_profile,
+    with_threads,
+)
+from sorawm.utils.frame_store import FrameStore, FrameStoreFull
+from sorawm.utils.media_info import MediaInfo
+from sorawm.utils.keyframe_utils import bbox_jumped, is_scene_change, make_thumbnail
+from sorawm.utils.pipeline import batched, run_pipeline
+from sorawm.utils.segment_utils import (
+    SegmentCheckpoint,
+    concat_segments,
+    fixed_segments,
+    split_gop_chunks,
+)
+from sorawm.utils.temporal_utils import TemporalPatchReuse
+from sorawm.utils.video_utils import FrameBufferPool, VideoLoader
 from sorawm.watermark_cleaner import WaterMarkCleaner
 from sorawm.watermark_detector import SoraWaterMarkDetector
 from sorawm.utils.imputation_utils import (
+    CPD_ENGINES,
+    OnlineBBoxImputer,
     find_2d_data_bkps,
-    get_interval_average_bbox,
-    find_idxs_interval,
 )
 
 VIDEO_EXTENSIONS = [".mp4", ".avi", ".mov", ".mkv", ".flv", ".wmv", ".webm"]
 
+
+class EncodeError(RuntimeError):
+    """The ffmpeg process encoding (and muxing) the output failed."""
+
+
 class SoraWM:
-    def __init__(self):
-        self.detector = SoraWaterMarkDetector()
-        self.cleaner = WaterMarkCleaner()
+    def __init__(
+        self,
+        single_decode: bool = True,
+        detect_batch_size: int = DETECT_BATCH_SIZE,
+        detect_interval: int = DETECT_INTERVAL,
+        roi_clean: bool = ROI_CLEAN,
+        clean_batch_size: int = CLEAN_BATCH_SIZE,
+        temporal_reuse: bool = False,
+        pooled_decode: bool = True,
+        num_workers: int = CHUNK_WORKERS,
+        encoder_profile: str | EncoderProfile = ENCODER_PROFILE,
+        encoder_threads: int | None = ENCODER_THREADS,
+        imputation_engine: str = IMPUTATION_ENGINE,
+        online_imputation: bool = ONLINE_IMPUTATION,
+        imputation_lookahead: int = IMPUTATION_LOOKAHEAD,
+        detection_cache: bool = DETECTION_CACHE,
+        device: str | None = None,
+    ):
+        self.options = {
+            "single_decode": single_decode,
+            "detect_batch_size": detect_batch_size,
+            "detect_interval": detect_interval,
+            "roi_clean": roi_clean,
+            "clean_batch_size": clean_batch_size,
+            "temporal_reuse": temporal_reuse,
+            "pooled_decode": pooled_decode,
+            "encoder_profile": encoder_profile,
+            "encoder_threads": encoder_threads,
+            "imputation_engine": imputation_engine,
+            "online_imputation": online_imputation,
+            "imputation_lookahead": imputation_lookahead,
+            "detection_cache": detection_cache,
+            "device": device,
+        }
+        # decode each video once and feed both passes from a FrameStore
+        self.single_decode = single_decode
+        self.detect_batch_size = max(1, detect_batch_size)
+        # run YOLO only every detect_interval frames and on scene changes
+        self.detect_interval = max(1, detect_interval)
+        # decode with readinto into reusable buffers instead of a new bytes per frame
+        self.pooled_decode = pooled_decode
+        # inpaint a context window around the bbox instead of the whole frame
+        self.roi_clean = roi_clean
+        self.clean_batch_size = max(1, clean_batch_size)
+        # reuse the previous fill when the watermark region barely changes
+        self.temporal_reuse = temporal_reuse
+        if temporal_reuse and not roi_clean:
+            logger.warning("temporal_reuse only applies to roi_clean, it is disabled")
+        # split long videos into GOP-aligned chunks processed in parallel
+        self.num_workers = max(1, num_workers)
+        # libx264 preset/thread settings, see sorawm.utils.encoder_utils
+        self.encoder_profile = get_encoder_profile(encoder_profile)
+        self.encoder_threads = encoder_threads
+        # change-point engine for frames without a detection, see find_2d_data_bkps
+        if imputation_engine not in CPD_ENGINES:
+            raise ValueError(
+                f"Unknown imputation engine: {imputation_engine}. "
+                f"Available engines: {CPD_ENGINES}"
+            )
+        self.imputation_engine = imputation_engine
+        # fill missed detections causally so cleaning runs right behind detection,
+        # segmenting on center jumps instead of imputation_engine
+        self.online_imputation = online_imputation
+        self.imputation_lookahead = max(1, imputation_lookahead)
+        # reuse the detections of an earlier run on the same video, e.g. on retries
+        self.detection_cache = detection_cache
+        self._clean_fps = None
+        # chunk worker pool, kept across runs so the workers load their models once
+        self._chunk_executor: ProcessPoolExecutor | None = None
+        # torch device of both models, None picks the best available one
+        self.detector = SoraWaterMarkDetector(device)
+        self.cleaner = WaterMarkCleaner(device)
 
     def run_batch(self, input_video_dir_path: Path,
         output_video_dir_path: Path | None = None,
@@ -60,16 +183,104 @@ class SoraWM:
         output_video_path: Path,
         progress_callback: Callable[[int], None] | None = None,
         quiet: bool = False,
+        media_info: MediaInfo | None = None,
+        checkpoint: SegmentCheckpoint | None = None,
+        video_hash: str | None = None,
     ):
-        input_video_loader = VideoLoader(input_video_path)
+        """Remove the watermark from a video. With a checkpoint, the output is
+        encoded in fixed-length segments and a later call with the same
+        checkpoint resumes after the last finished segment. video_hash is the
+        SHA-256 of the input when the caller already has it, so the detection
+        cache does not hash the file again."""
+        input_video_loader = VideoLoader(input_video_path, media_info)
         output_video_path.parent.mkdir(parents=True, exist_ok=True)
+
+        chunks = []
+        if checkpoint is None and self.num_workers > 1:
+            chunks = split_gop_chunks(
+                input_video_loader.keyframe_indices(),
+                input_video_loader.total_frames,
+                self.num_workers,
+                min_frames=int(input_video_loader.fps * CHUNK_MIN_SECONDS),
+            )
+        if checkpoint is not None:
+            self._run_checkpointed(
+                input_video_loader,
+                checkpoint,
+                output_video_path,
+                progress_callback,
+                quiet,
+                video_hash=video_hash,
+            )
+        elif len(chunks) > 1:
+            self._run_chunks(
+                input_video_loader,
+                chunks,
+                output_video_path,
+                progress_callback,
+                quiet,
+                video_hash=video_hash,
+            )
+        else:
+            # the encoder muxes the source audio itself, no second pass needed
+            try:
+                self.process_range(
+                    input_video_loader,
+                    output_video_path,
+                    progress_callback=progress_callback,
+                    quiet=quiet,
+                    with_audio=True,
+                    video_hash=video_hash,
+                )
+            except EncodeError as e:
+                if not input_video_loader.has_audio:
+                    raise
+                # an unusable audio stream makes ffmpeg fail on startup, before
+                # more than a few frames were cleaned, so the retry is cheap
+                logger.warning(f"Encoding with the source audio failed, retrying without audio: {e}")
+                self.process_range(
+                    input_video_loader,
+                    output_video_path,
+                    progress_callback=progress_callback,
+                    quiet=quiet,
+                    video_hash=video_hash,
+                )
+        if not quiet:
+            logger.info(f"Saved no watermark video at: {output_video_path}")
+
+        # 95% - 99%
+        if progress_callback:
+            progress_callback(99)
+
+    def process_range(
+        self,
+        input_video_loader: VideoLoader,
+        output_video_path: Path,
+        start: int = 0,
+        end: int | None = None,
+        progress_callback: Callable[[int], None] | None = None,
+        quiet: bool = False,
+        with_audio: bool = False,
+        video_hash: str | None = None,
+    ):
+        """Remove the watermark from frames [start, end) and encode them to
+        output_video_path. With `with_audio`, the audio of the source file is
+        muxed in the same ffmpeg process, which only makes sense for the whole
+        video. video_hash is the content hash of the input when the caller
+        already knows it (detection cache key). Progress is reported in the
+        10% - 95% range."""
         width = input_video_loader.width
         height = input_video_loader.height
         fps = input_video_loader.fps
-        total_frames = input_video_loader.total_frames
+        # the probed frame count is only an estimate when the container has no
+        # nb_frames, so the last range decodes to EOF instead of stopping there
+        to_eof = end is None or end >= input_video_loader.total_frames
+        if to_eof:
+            end = input_video_loader.total_frames
+        decode_end = None if to_eof else end
+        # sizes progress and buffers, the track grows past it if needed
+        total_frames = max(end - start, 1)
 
-        temp_output_path = output_video_path.parent / f"temp_{output_video_path.name}"
-        
         # Build FFmpeg input stream
         ffmpeg_input = ffmpeg.input(
             "pipe:",
@@ -79,30 +290,33 @@ class SoraWM:
             r=fps,
         )
         
-        # Build output stream with safe, compatible options
-        # Use explicit parameters that work across all FFmpeg versions
-        output_kwargs = {
-            "vcodec": "libx264",
-            "pix_fmt": "yuv420p",
-            "r": fps,  # Match input framerate
-        }
-        
-        # Set quality/bitrate - use CRF for quality (lower = better quality)
-        # CRF 20 is a good balance (default is 23, 20 gives better quality)
-        if input_video_loader.original_bitrate:
-            # Use bitrate if available from source
-            bitrate = int(int(input_video_loader.original_bitrate) * 1.2)
-            output_kwargs["video_bitrate"] = str(bitrate)
-            output_kwargs["bufsize"] = str(bitrate * 2)  # Buffer size
-        else:
-            # Use CRF for quality-based encoding (no preset needed)
-            output_kwargs["crf"] = "20"  # Quality setting (18-28 range, lower = better)
-        
+        # Build output stream from the encoder profile
+        encoder_profile = get_encoder_profile(self.encoder_profile)
+        encoder_threads = self.encoder_threads
+        if encoder_profile.name == "auto":
+            # keep up with the inpainting throughput measured on the last video,
+            # or with real time before anything was measured
+            encoder_profile = select_auto_profile(
+                width, height, self._clean_fps or fps, encoder_threads
+            )
+        encoder_profile = with_threads(encoder_profile, encoder_threads)
+        output_kwargs = build_encoder_kwargs(
+            encoder_profile, fps, input_video_loader.original_bitrate
+        )
+        if not quiet:
+            logger.debug(f"encoder profile: {encoder_profile}")
+
         # Create output stream
-        ffmpeg_output = ffmpeg.output(ffmpeg_input, str(temp_output_path), **output_kwargs)
+        output_streams = [ffmpeg_input]
+        if with_audio and input_video_loader.has_audio:
+            # take the audio straight from the source file as a second input
+            output_streams.append(ffmpeg.input(str(input_video_loader.video_path)).audio)
+            output_kwargs.update(
+                build_audio_kwargs(output_video_path, input_video_loader.audio_codec)
+            )
+        ffmpeg_output = ffmpeg.output(*output_streams, str(output_video_path), **output_kwargs)
         
         # Start FFmpeg process with proper error handling
-        # No preset option - using default libx264 settings which are reliable
         process_out = (
             ffmpeg_output
             .overwrite_output()
@@ -110,78 +324,202 @@ class SoraWM:
             .run_async(pipe_stdin=True, pipe_stderr=True)
         )
 
-        frame_bboxes = {}
-        detect_missed = []
-        bbox_centers = []
-        bboxes = []
+        # per-frame detections of an earlier run on the same video and settings
+        cache_key = None
+        bbox_track = None
+        if self.detection_cache:
+            cache_key = detection_cache_key(
+                input_video_loader.video_path,
+                start,
+                end,
+                detection_params(self.detect_interval),
+                video_hash=video_hash,
+            )
+            bbox_track = load_detections(cache_key)
+        cache_hit = bbox_track is not None
+        if cache_hit:
+            if not quiet:
+                logger.info("Loaded watermark detections from the detection cache")
+        else:
+            bbox_track = BBoxTrack(total_frames)
+
+        # the track is complete on a cache hit, the offline path can clean right away
+        online = self.online_imputation and not cache_hit
+        # online imputation reads the frames back from the store while decoding continues
+        frame_store = None
+        if online:
+            # only holds the frames between decode and clean, which the
+            # pipeline queues and the lookahead bound; a ring shorter than that
+            # would spill every frame to disk and read it back
+            window = (
+                self.imputation_lookahead
+                + self.detect_batch_size * self.detect_interval
+                + PIPELINE_QUEUE_SIZE
+            )
+            frame_store = FrameStore(width, height, max_disk_mb=None, min_ram_frames=window)
+            ram_mb = frame_store.ram_frames * frame_store.frame_size / (1024 * 1024)
+            if ram_mb > FRAME_STORE_MAX_RAM_MB:
+                logger.warning(
+                    f"Frame store ring grown to {window} frames ({ram_mb:.0f} MB) to cover "
+                    f"the imputation lookahead, above FRAME_STORE_MAX_RAM_MB={FRAME_STORE_MAX_RAM_MB}; "
+                    "lower IMPUTATION_LOOKAHEAD to bound memory"
+                )
+        elif self.single_decode and not cache_hit:
+            frame_store = FrameStore(width, height)
+            if total_frames > frame_store.capacity:
+                # spilling the whole video costs more scratch disk than allowed
+                if not quiet:
+                    logger.info(
+                        "Video exceeds the frame store disk budget, decoding it twice"
+                    )
+                frame_store = None
         if not quiet:
             logger.debug(
                 f"total frames: {total_frames}, fps: {fps}, width: {width}, height: {height}"
             )
-        for idx, frame in enumerate(
-            tqdm(input_video_loader, total=total_frames, desc="Detect watermarks", disable=quiet)
-        ):
-            detection_result = self.detector.detect(frame)
-            if detection_result["detected"]:
-                frame_bboxes[idx] = { "bbox": detection_result["bbox"]}
-                x1, y1, x2, y2 = detection_result["bbox"]
-                bbox_centers.append((int((x1 + x2) / 2), int((y1 + y2) / 2)))
-                bboxes.append((x1, y1, x2, y2))
-
+        def record_detection(idx: int, detection_result: dict | None):
+            if detection_result is None:
+                # not run through YOLO, filled from the change-point intervals below
+                bbox_track.set_skipped(idx)
+            elif detection_result["detected"]:
+                bbox_track.set(
+                    idx, detection_result["bbox"], detection_result["confidence"]
+                )
             else:
-                frame_bboxes[idx] = {"bbox": None}
-                detect_missed.append(idx)
-                bbox_centers.append(None)
-                bboxes.append(None)
+                bbox_track.set(idx, None)
+
+        def save_detection_cache():
+            if cache_key is None or cache_hit:
+                return
+            try:
+                save_detections(cache_key, bbox_track)
+            except Exception as e:
+                logger.warning(f"Failed to save the detection cache: {e}")
+
+        def report_detect_progress(idx: int):
             # 10% - 50%
             if progress_callback and idx % 10 == 0:
-                progress = 10 + int((idx / total_frames) * 40)
+                progress = 10 + int(min(idx / total_frames, 1) * 40)
                 progress_callback(progress)
-        if not quiet:
-            logger.debug(f"detect missed frames: {detect_missed}")
-        if detect_missed:
-            # 1. find the bkps of the bbox centers
-            bkps = find_2d_data_bkps(bbox_centers)
-            # add the start and end position, to form the complete interval boundaries
-            bkps_full = [0] + bkps + [total_frames]
-            # logger.debug(f"bkps intervals: {bkps_full}")
-
-            # 2. calculate the average bbox of each interval
-            interval_bboxes = get_interval_average_bbox(bboxes, bkps_full)
-            # logger.debug(f"interval average bboxes: {interval_bboxes}")
-
-            # 3. find the interval index of each missed frame
-            missed_intervals = find_idxs_interval(detect_missed, bkps_full)
-            # logger.debug(
-            #     f"missed frame intervals: {list(zip(detect_missed, missed_intervals))}"
-            # )
-
-            # 4. fill the missed frames with the average bbox of the corresponding interval
-            for missed_idx, interval_idx in zip(detect_missed, missed_intervals):
-                if (
-                    interval_idx < len(interval_bboxes)
-                    and interval_bboxes[interval_idx] is not None
-                ):
-                    frame_bboxes[missed_idx]["bbox"] = interval_bboxes[interval_idx]
-                    if not quiet:
+
+        if self.pooled_decode:
+            # enough buffers for the frames held by the queue and a detection batch
+            frame_pool = FrameBufferPool(
+                width,
+                height,
+                self.detect_batch_size * self.detect_interval + PIPELINE_QUEUE_SIZE + 2,
+            )
+            release_frame = frame_pool.release
+        else:
+            frame_pool = None
+            release_frame = lambda frame: None
+
+        def decode_stage(_):
+            nonlocal frame_store
+            if frame_pool is not None:
+                frames = input_video_loader.iter_range(start, decode_end, pool=frame_pool)
+            else:
+                frames = input_video_loader.iter_range(start, decode_end)
+            for idx, frame in enumerate(
+                tqdm(frames, total=total_frames, desc="Detect watermarks", disable=quiet)
+            ):
+                if frame_store is not None:
+                    try:
+                        frame_store.append(frame)
+                    except FrameStoreFull:
+                        # the frame count estimate was short, the clean pass
+                        # decodes the video again instead
+                        frame_store.close()
+                        frame_store = None
+                yield idx, frame
+
+        def detect_stage(items):
+            for idx, detection_result in self._detect_frames(items, release_frame):
+                record_detection(idx, detection_result)
+                report_detect_progress(idx)
+
+        def detect_stream_stage(items):
+            for idx, detection_result in self._detect_frames(items, release_frame):
+                record_detection(idx, detection_result)
+                yield idx, detection_result
+
+        if not online:
+            if not cache_hit:
+                try:
+                    run_pipeline(
+                        [decode_stage, detect_stage],
+                        on_error=frame_pool.close if frame_pool is not None else None,
+                    )
+                except Exception:
+                    if frame_store is not None:
+                        frame_store.close()
+                    raise
+                # raw detections, before the imputation below fills the track
+                save_detection_cache()
+            detect_missed = np.flatnonzero(~bbox_track.valid & ~bbox_track.skipped)
+            if not quiet:
+                logger.debug(f"detect missed frames: {detect_missed.tolist()}")
+                if bbox_track.skipped.any():
+                    logger.debug(
+                        f"sparse detection skipped {int(bbox_track.skipped.sum())} frames"
+                    )
+            # the missed and the skipped frames
+            frames_to_fill = np.flatnonzero(~bbox_track.valid)
+            if len(frames_to_fill):
+                # 1. find the bkps of the bbox centers
+                bkps = find_2d_data_bkps(
+                    bbox_track.centers(),
+                    engine=self.imputation_engine,
+                    valid=bbox_track.valid,
+                )
+                # add the start and end position, to form the complete interval boundaries
+                bkps_full = [0] + bkps + [len(bbox_track)]
+
+                # 2. fill the frames with the average bbox of their interval, or
+                # from the previous and next frame when the interval has no valid
+                # bbox (fallback strategy)
+                filled = bbox_track.fill(frames_to_fill, bkps_full)
+                if not quiet:
+                    for missed_idx in np.intersect1d(detect_missed, filled):
                         logger.debug(f"Filled missed frame {missed_idx} with bbox:\n"
-                        f" {interval_bboxes[interval_idx]}")
-                else:
-                    # if the interval has no valid bbox, use the previous and next frame to complete (fallback strategy)
-                    before = max(missed_idx - 1, 0)
-                    after = min(missed_idx + 1, total_frames - 1)
-                    before_box = frame_bboxes[before]["bbox"]
-                    after_box = frame_bboxes[after]["bbox"]
-                    if before_box:
-                        frame_bboxes[missed_idx]["bbox"] = before_box
-                    elif after_box:
-                        frame_bboxes[missed_idx]["bbox"] = after_box
+                        f" {bbox_track.get(missed_idx)}")
+
+        if online:
+            imputer = OnlineBBoxImputer(self.imputation_lookahead)
+
+            def impute_stage(items):
+                for idx, detection_result in items:
+                    bbox = None
+                    if detection_result is not None and detection_result["detected"]:
+                        bbox = detection_result["bbox"]
+                    yield from imputer.push(idx, bbox)
+                yield from imputer.finish()
+
+            def read_stage(items):
+                for idx, bbox in tqdm(items, total=total_frames, desc="Remove watermarks", disable=quiet):
+                    # a copy, the ring slot is reused while decoding goes on
+                    frame = frame_store.get(idx, copy=True)
+                    frame_store.release(idx + 1)
+                    yield idx, frame, bbox
+
+            read_stages = [
+                decode_stage,
+                detect_stream_stage,
+                impute_stage,
+                read_stage,
+            ]
         else:
-            del bboxes
-            del bbox_centers
-            del detect_missed
-        
-        input_video_loader = VideoLoader(input_video_path)
+            if frame_store is not None:
+                # the frames were already decoded during detection
+                clean_frames = frame_store
+            else:
+                clean_frames = input_video_loader.iter_range(start, decode_end)
+
+            def read_stage(_):
+                for idx, frame in enumerate(tqdm(clean_frames, total=total_frames, desc="Remove watermarks", disable=quiet)):
+                    yield idx, frame, bbox_track.get(idx)
+
+            read_stages = [read_stage]
 
         try:
             # Read stderr in background to prevent blocking
@@ -202,7 +540,7 @@ class SoraWM:
             stderr_thread = threading.Thread(target=read_stderr, daemon=True)
             stderr_thread.start()
             
-            for idx, frame in enumerate(tqdm(input_video_loader, total=total_frames, desc="Remove watermarks", disable=quiet)):
+            def write_frame(idx: int, cleaned_frame: np.ndarray):
                 # Check if FFmpeg process is still alive (non-blocking check)
                 if process_out.poll() is not None:
                     # Process has terminated unexpectedly
@@ -217,20 +555,11 @@ class SoraWM:
                                 stderr_output = remaining
                         except:
                             pass
-                    raise RuntimeError(
+                    raise EncodeError(
                         f"FFmpeg process terminated unexpectedly at frame {idx}/{total_frames} with return code {return_code}. "
                         f"Error: {stderr_output}"
                     )
-                
-                bbox = frame_bboxes[idx]["bbox"]
-                if bbox is not None:
-                    x1, y1, x2, y2 = bbox
-                    mask = np.zeros((height, width), dtype=np.uint8)
-                    mask[y1:y2, x1:x2] = 255
-                    cleaned_frame = self.cleaner.clean(frame, mask)
-                else:
-                    cleaned_frame = frame
-                
+
                 # Write frame to FFmpeg pipe with error handling
                 try:
                     process_out.stdin.write(cleaned_frame.tobytes())
@@ -245,7 +574,7 @@ class SoraWM:
                                 stderr_output = remaining
                         except:
                             pass
-                    raise RuntimeError(
+                    raise EncodeError(
                         f"FFmpeg pipe broken at frame {idx}/{total_frames}. "
                         f"This usually means FFmpeg crashed. Error: {stderr_output}"
                     ) from e
@@ -254,19 +583,57 @@ class SoraWM:
                     if process_out.poll() is not None:
                         return_code = process_out.returncode
                         stderr_output = '\n'.join(stderr_lines)
-                        raise RuntimeError(
+                        raise EncodeError(
                             f"FFmpeg process terminated at frame {idx}/{total_frames} with return code {return_code}. "
                             f"Error: {stderr_output}"
                         ) from e
-                    raise RuntimeError(f"Error writing frame {idx} to FFmpeg: {e}") from e
+                    raise EncodeError(f"Error writing frame {idx} to FFmpeg: {e}") from e
                 except Exception as e:
-                    raise RuntimeError(f"Error writing frame {idx} to FFmpeg: {e}") from e
+                    raise EncodeError(f"Error writing frame {idx} to FFmpeg: {e}") from e
 
-                # 50% - 95%
+                # 50% - 95%, or 10% - 95% when detection runs in the same pass
                 if progress_callback and idx % 10 == 0:
-                    progress = 50 + int((idx / total_frames) * 45)
+                    if online:
+                        progress = 10 + int(min(idx / total_frames, 1) * 85)
+                    else:
+                        progress = 50 + int(min(idx / total_frames, 1) * 45)
                     progress_callback(progress)
 
+            def prepare_stage(items):
+                for batch in batched(items, self.clean_batch_size):
+                    idxs = [idx for idx, _, _ in batch]
+                    frames = [frame for _, frame, _ in batch]
+                    bboxes = [bbox for _, _, bbox in batch]
+                    yield self._prepare_clean_batch(idxs, frames, bboxes)
+
+            patch_reuse = (
+                TemporalPatchReuse() if self.temporal_reuse and self.roi_clean else None
+            )
+
+            def inpaint_stage(batches):
+                for batch in batches:
+                    yield from self._inpaint_clean_batch(batch, patch_reuse)
+
+            def encode_stage(items):
+                for idx, cleaned_frame in items:
+                    write_frame(idx, cleaned_frame)
+
+            clean_start_time = time.time()
+            run_pipeline(
+                [*read_stages, prepare_stage, inpaint_stage, encode_stage],
+                on_error=frame_pool.close if frame_pool is not None else None,
+            )
+            self._clean_fps = total_frames / max(time.time() - clean_start_time, 1e-6)
+            if online:
+                save_detection_cache()
+                if not quiet:
+                    logger.debug(f"online imputation filled {imputer.filled_frames} frames")
+            if patch_reuse is not None and not quiet:
+                logger.debug(
+                    f"temporal reuse: {patch_reuse.reused_frames} frames reused, "
+                    f"{patch_reuse.model_frames} frames inpainted"
+                )
+
             # Close stdin and wait for FFmpeg to finish
             process_out.stdin.close()
             
@@ -303,7 +670,7 @@ class SoraWM:
                     pass
             
             if return_code != 0:
-                raise RuntimeError(
+                raise EncodeError(
                     f"FFmpeg encoding failed with return code {return_code}. "
                     f"Error: {stderr_output}"
                 )
@@ -323,64 +690,377 @@ class SoraWM:
                 except:
                     pass
             raise
+        finally:
+            if frame_store is not None:
+                frame_store.close()
 
-        # 95% - 99%
-        if progress_callback:
-            progress_callback(95)
+    def _run_chunks(
+        self,
+        input_video_loader: VideoLoader,
+        chunks: List[Tuple[int, int]],
+        output_video_path: Path,
+        progress_callback: Callable[[int], None] | None = None,
+        quiet: bool = False,
+        video_hash: str | None = None,
+    ):
+        """Process GOP-aligned chunks in a process pool, then concatenate the
+        encoded segments without re-encoding and mux the source audio in the
+        same pass."""
+        if not quiet:
+            logger.info(f"Processing {len(chunks)} chunks with {self.num_workers} workers: {chunks}")
+        SCRATCH_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=SCRATCH_DIR) as segment_dir:
+            segment_paths = [
+                Path(segment_dir) / f"segment_{chunk_idx:05d}.mp4"
+                for chunk_idx in range(len(chunks))
+            ]
+            self._encode_segments(
+                input_video_loader,
+                chunks,
+                segment_paths,
+                progress_callback,
+                quiet,
+                video_hash=video_hash,
+            )
+            self._concat_with_audio(input_video_loader, segment_paths, output_video_path)
 
-        self.merge_audio_track(input_video_path, temp_output_path, output_video_path)
+    def _run_checkpointed(
+        self,
+        input_video_loader: VideoLoader,
+        checkpoint: SegmentCheckpoint,
+        output_video_path: Path,
+        progress_callback: Callable[[int], None] | None = None,
+        quiet: bool = False,
+        video_hash: str | None = None,
+    ):
+        """Encode fixed-length segments, skipping the ones the checkpoint
+        already has, and concatenate them once all are done."""
+        if checkpoint.segment_frames is None:
+            # a segment the frame store holds in RAM is decoded once without spilling
+            checkpoint.segment_frames = max(
+                1,
+                min(
+                    round(input_video_loader.fps * CHECKPOINT_SEGMENT_SECONDS),
+                    FrameStore.ram_capacity(
+                        input_video_loader.width, input_video_loader.height
+                    ),
+                ),
+            )
+        segments = fixed_segments(
+            input_video_loader.total_frames, checkpoint.segment_frames
+        )
+        pending = [idx for idx in range(len(segments)) if not checkpoint.is_done(idx)]
+        if not quiet and len(pending) < len(segments):
+            logger.info(
+                f"Resuming from checkpoint, {len(segments) - len(pending)}/{len(segments)} "
+                f"segments already encoded"
+            )
+        checkpoint.segment_dir.mkdir(parents=True, exist_ok=True)
+        self._encode_segments(
+            input_video_loader,
+            [segments[idx] for idx in pending],
+            [checkpoint.segment_path(idx) for idx in pending],
+            progress_callback,
+            quiet,
+            on_segment_done=lambda i: checkpoint.commit(pending[i]),
+            done_frames=input_video_loader.total_frames
+            - sum(end - start for start, end in (segments[idx] for idx in pending)),
+            video_hash=video_hash,
+        )
+        self._concat_with_audio(
+            input_video_loader,
+            [checkpoint.segment_path(idx) for idx in range(len(segments))],
+            output_video_path,
+        )
 
-        if progress_callback:
-            progress_callback(99)
+    def _chunk_worker_options(self) -> dict:
+        """SoraWM options of the chunk workers: one process each, and the
+        cores split between their encoders unless encoder_threads is set."""
+        encoder_threads = self.encoder_threads
+        if encoder_threads is None:
+            encoder_threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+        return {**self.options, "num_workers": 1, "encoder_threads": encoder_threads}
 
-    def merge_audio_track(
-        self, input_video_path: Path, temp_output_path: Path, output_video_path: Path
+    def _get_chunk_executor(self) -> ProcessPoolExecutor:
+        if self._chunk_executor is None:
+            # spawn, so every worker gets a clean CUDA context and its own models
+            self._chunk_executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_chunk_worker,
+                initargs=(self._chunk_worker_options(),),
+            )
+        return self._chunk_executor
+
+    def close(self):
+        """Shut down the chunk worker processes, if any were started. The
+        instance stays usable, the next chunked run starts a new pool."""
+        if self._chunk_executor is not None:
+            self._chunk_executor.shutdown(wait=True, cancel_futures=True)
+            self._chunk_executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _encode_segments(
+        self,
+        input_video_loader: VideoLoader,
+        ranges: List[Tuple[int, int]],
+        segment_paths: List[Path],
+        progress_callback: Callable[[int], None] | None = None,
+        quiet: bool = False,
+        on_segment_done: Callable[[int], None] | None = None,
+        done_frames: int = 0,
+        video_hash: str | None = None,
     ):
-        logger.info("Merging audio track...")
-        try:
-            # Check if input video has audio
-            probe = ffmpeg.probe(str(input_video_path))
-            has_audio = any(stream.get('codec_type') == 'audio' for stream in probe.get('streams', []))
-            
-            if has_audio:
-                video_stream = ffmpeg.input(str(temp_output_path))
-                audio_stream = ffmpeg.input(str(input_video_path)).audio
-
-                (
-                    ffmpeg.output(
-                        video_stream,
-                        audio_stream,
-                        str(output_video_path),
-                        vcodec="copy",  # Copy video codec (no re-encoding)
-                        acodec="aac",   # Encode audio to AAC
-                        strict="experimental",  # Allow experimental codecs if needed
+        """Encode each frame range to its own file, in a process pool when
+        num_workers > 1. on_segment_done gets the position of every finished
+        range, done_frames counts frames finished before (for progress)."""
+        total_frames = max(
+            done_frames + sum(end - start for start, end in ranges), 1
+        )
+
+        def report(frames: float):
+            # 10% - 95%
+            if progress_callback:
+                progress_callback(10 + int(frames / total_frames * 85))
+
+        if self.num_workers > 1 and len(ranges) > 1:
+            if video_hash is None and self.detection_cache:
+                # hashed once here rather than in every worker for the detection cache
+                video_hash = file_sha256(input_video_loader.video_path)
+            executor = self._get_chunk_executor()
+            futures = {}
+            try:
+                for i, ((start, end), segment_path) in enumerate(zip(ranges, segment_paths)):
+                    future = executor.submit(
+                        _process_chunk,
+                        input_video_loader.video_path,
+                        input_video_loader.media_info,
+                        start,
+                        end,
+                        segment_path,
+                        video_hash,
                     )
-                    .overwrite_output()
-                    .global_args("-loglevel", "warning")
-                    .run(quiet=False, capture_stdout=True, capture_stderr=True)
-                )
+                    futures[future] = i
+                for future in as_completed(futures):
+                    future.result()
+                    i = futures[future]
+                    if on_segment_done is not None:
+                        on_segment_done(i)
+                    start, end = ranges[i]
+                    done_frames += end - start
+                    report(done_frames)
+            except BrokenProcessPool:
+                # a worker died, start a fresh pool on the next run
+                self.close()
+                raise
+            except BaseException:
+                # the pool outlives this run, so drop its leftover chunks here
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+                raise
+            return
+
+        for i, ((start, end), segment_path) in enumerate(zip(ranges, segment_paths)):
+
+            def segment_progress(progress: int, start=start, end=end):
+                # process_range reports 10% - 95% of this segment
+                report(done_frames + (progress - 10) / 85 * (end - start))
+
+            self.process_range(
+                input_video_loader,
+                segment_path,
+                start=start,
+                end=end,
+                progress_callback=segment_progress if progress_callback else None,
+                quiet=quiet,
+                video_hash=video_hash,
+            )
+            if on_segment_done is not None:
+                on_segment_done(i)
+            done_frames += end - start
+
+    def _concat_with_audio(
+        self,
+        input_video_loader: VideoLoader,
+        segment_paths: List[Path],
+        output_video_path: Path,
+    ):
+        audio_kwargs = None
+        if input_video_loader.has_audio:
+            audio_kwargs = build_audio_kwargs(
+                output_video_path, input_video_loader.audio_codec
+            )
+        try:
+            concat_segments(
+                segment_paths,
+                output_video_path,
+                audio_source=input_video_loader.video_path if audio_kwargs else None,
+                audio_kwargs=audio_kwargs,
+            )
+        except RuntimeError as e:
+            if audio_kwargs is None:
+                raise
+            # the segments are still there, keep the video rather than fail the job
+            logger.warning(f"Muxing the source audio failed, saving the video without audio: {e}")
+            concat_segments(segment_paths, output_video_path)
+
+    def _detect_frames(
+        self,
+        items,
+        release_frame: Callable[[np.ndarray], None] = lambda frame: None,
+    ):
+        """Yield (idx, detection_result) in frame order, with None as the result
+        of frames sparse detection skipped. Each frame is handed to
+        release_frame once it is no longer needed."""
+        if self.detect_interval > 1:
+            yield from self._detect_sparse(items, release_frame)
+            return
+        for batch in batched(items, self.detect_batch_size):
+            detection_results = self.detector.detect_batch([frame for _, frame in batch])
+            for (idx, frame), detection_result in zip(batch, detection_results):
+                release_frame(frame)
+                yield idx, detection_result
+
+    def _detect_sparse(
+        self,
+        items,
+        release_frame: Callable[[np.ndarray], None] = lambda frame: None,
+    ):
+        """Detect keyframes only, re-detecting the frames between two keyframes
+        densely when the bbox jumped. Results are yielded like _detect_frames."""
+        segments = []  # (gap frames, keyframe), the keyframe closes the gap
+        gap = []
+        prev_thumbnail = None
+        prev_key_result = None
+
+        def flush_segments():
+            nonlocal prev_key_result
+            key_results = self.detector.detect_batch(
+                [key_frame for _, (_, key_frame) in segments]
+            )
+            for (gap_items, (key_idx, key_frame)), key_result in zip(segments, key_results):
+                if gap_items and (
+                    prev_key_result is None or bbox_jumped(prev_key_result, key_result)
+                ):
+                    for batch in batched(gap_items, self.detect_batch_size):
+                        detection_results = self.detector.detect_batch(
+                            [frame for _, frame in batch]
+                        )
+                        for (idx, frame), detection_result in zip(batch, detection_results):
+                            release_frame(frame)
+                            yield idx, detection_result
+                else:
+                    for idx, frame in gap_items:
+                        release_frame(frame)
+                        yield idx, None
+                release_frame(key_frame)
+                yield key_idx, key_result
+                prev_key_result = key_result
+            segments.clear()
+
+        for idx, frame in items:
+            thumbnail = make_thumbnail(frame)
+            scene_change = prev_thumbnail is not None and is_scene_change(
+                prev_thumbnail, thumbnail
+            )
+            prev_thumbnail = thumbnail
+            if idx % self.detect_interval == 0 or scene_change:
+                segments.append((gap, (idx, frame)))
+                gap = []
+                if len(segments) >= self.detect_batch_size:
+                    yield from flush_segments()
             else:
-                # No audio track, just copy video to output
-                logger.info("No audio track found, copying video only...")
-                shutil.copy2(str(temp_output_path), str(output_video_path))
-            
-            # Clean up temporary file
-            if temp_output_path.exists():
-                temp_output_path.unlink()
-            logger.info(f"Saved no watermark video at: {output_video_path}")
-        except Exception as e:
-            logger.error(f"Error merging audio: {e}")
-            # If audio merge fails, at least save the video without audio
-            if temp_output_path.exists():
-                try:
-                    shutil.copy2(str(temp_output_path), str(output_video_path))
-                    logger.warning(f"Saved video without audio due to merge error: {output_video_path}")
-                    temp_output_path.unlink()
-                except Exception as copy_error:
-                    logger.error(f"Failed to copy video file: {copy_error}")
-                    raise RuntimeError(f"Failed to merge audio and save video: {e}") from e
+                gap.append((idx, frame))
+        if gap:
+            # the last frame always closes the final gap as a keyframe
+            segments.append((gap[:-1], gap[-1]))
+        yield from flush_segments()
+
+    def _prepare_clean_batch(
+        self, idxs: List[int], frames: List[np.ndarray], bboxes: List[tuple | None]
+    ) -> dict:
+        """Build the model inputs (crops or full frames plus masks) for one batch."""
+        targets = [i for i, bbox in enumerate(bboxes) if bbox is not None]
+        windows = None
+        if self.roi_clean:
+            windows, inputs, masks = self.cleaner.crop_regions(
+                [frames[i] for i in targets], [bboxes[i] for i in targets]
+            )
+        else:
+            inputs = [frames[i] for i in targets]
+            masks = []
+            for i in targets:
+                height, width = frames[i].shape[:2]
+                x1, y1, x2, y2 = bboxes[i]
+                mask = np.zeros((height, width), dtype=np.uint8)
+                mask[y1:y2, x1:x2] = 255
+                masks.append(mask)
+        return {
+            "idxs": idxs,
+            "frames": frames,
+            "targets": targets,
+            "windows": windows,
+            "inputs": inputs,
+            "masks": masks,
+        }
+
+    def _inpaint_clean_batch(
+        self, batch: dict, patch_reuse: TemporalPatchReuse | None = None
+    ) -> List[Tuple[int, np.ndarray]]:
+        """Inpaint a prepared batch, frames without a bbox pass through unchanged."""
+        cleaned_frames = list(batch["frames"])
+        targets = batch["targets"]
+        if targets:
+            if batch["windows"] is not None and patch_reuse is not None:
+                cleaned_crops = patch_reuse.clean(
+                    batch["windows"], batch["inputs"], batch["masks"], self.cleaner.clean_crops
+                )
+                results = self.cleaner.paste_regions(
+                    [cleaned_frames[i] for i in targets], batch["windows"], cleaned_crops
+                )
+            elif batch["windows"] is not None:
+                cleaned_crops = self.cleaner.clean_crops(batch["inputs"], batch["masks"])
+                results = self.cleaner.paste_regions(
+                    [cleaned_frames[i] for i in targets], batch["windows"], cleaned_crops
+                )
             else:
-                raise RuntimeError(f"Failed to merge audio: {e}") from e
+                results = self.cleaner.clean_batch(batch["inputs"], batch["masks"])
+            for i, result in zip(targets, results):
+                cleaned_frames[i] = result
+        return list(zip(batch["idxs"], cleaned_frames))
+
+
+_chunk_worker_sora_wm: SoraWM | None = None
+
+
+def _init_chunk_worker(options: dict):
+    global _chunk_worker_sora_wm
+    _chunk_worker_sora_wm = SoraWM(**options)
+
+
+def _process_chunk(
+    input_video_path: Path,
+    media_info: MediaInfo,
+    start: int,
+    end: int,
+    segment_path: Path,
+    video_hash: str | None = None,
+):
+    # reuse the parent's probe instead of running ffprobe in every worker
+    _chunk_worker_sora_wm.process_range(
+        VideoLoader(input_video_path, media_info),
+        segment_path,
+        start=start,
+        end=end,
+        quiet=True,
+        video_hash=video_hash,
+    )
 
 
 if __name__ == "__main__":
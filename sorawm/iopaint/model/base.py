@@ -24,6 +24,8 @@ class InpaintModel:
     pad_mod = 8
     pad_to_square = False
     is_erase_model = False
+    # forward_batch runs a real [N, C, H, W] batch
+    support_batch = False
 
     def __init__(self, device, **kwargs):
         """
@@ -80,6 +82,44 @@ class InpaintModel:
             result = result * (mask / 255) + image[:, :, ::-1] * (1 - (mask / 255))
         return result
 
+    def forward_batch(self, images, masks, config: InpaintRequest):
+        """Batched forward, all images/masks share the same size
+        images: list of [H, W, C] RGB
+        masks: list of [H, W, 1] 255 为 masks 区域
+        return: list of BGR IMAGE
+        """
+        return [
+            self.forward(image, mask, config) for image, mask in zip(images, masks)
+        ]
+
+    def _pad_forward_batch(self, images, masks, config: InpaintRequest):
+        origin_height, origin_width = images[0].shape[:2]
+        pad_images = [
+            pad_img_to_modulo(
+                image, mod=self.pad_mod, square=self.pad_to_square, min_size=self.min_size
+            )
+            for image in images
+        ]
+        pad_masks = [
+            pad_img_to_modulo(
+                mask, mod=self.pad_mod, square=self.pad_to_square, min_size=self.min_size
+            )
+            for mask in masks
+        ]
+
+        results = self.forward_batch(pad_images, pad_masks, config)
+
+        outputs = []
+        for result, image, mask in zip(results, images, masks):
+            image, mask = self.forward_pre_process(image, mask, config)
+            result = result[0:origin_height, 0:origin_width, :]
+            result, image, mask = self.forward_post_process(result, image, mask, config)
+            if config.sd_keep_unmasked_area:
+                mask = mask[:, :, np.newaxis]
+                result = result * (mask / 255) + image[:, :, ::-1] * (1 - (mask / 255))
+            outputs.append(result)
+        return outputs
+
     def forward_pre_process(self, image, mask, config):
         return image, mask
 
@@ -142,6 +182,35 @@ class InpaintModel:
 
         return inpaint_result
 
+    def _skip_hd_strategy(self, image, config: InpaintRequest) -> bool:
+        if config.hd_strategy == HDStrategy.CROP:
+            return max(image.shape) <= config.hd_strategy_crop_trigger_size
+        if config.hd_strategy == HDStrategy.RESIZE:
+            return max(image.shape) <= config.hd_strategy_resize_limit
+        return True
+
+    @torch.no_grad()
+    def batch_call(self, images, masks, config: InpaintRequest):
+        """
+        images: list of [H, W, C] RGB, not normalized
+        masks: list of [H, W]
+        return: list of BGR IMAGE
+
+        Same-sized inputs that need no hd_strategy preprocessing run as one
+        batched forward on models that support it, anything else falls back
+        to one __call__ per pair.
+        """
+        if len(images) == 0:
+            return []
+        same_shape = all(image.shape == images[0].shape for image in images)
+        if (
+            self.support_batch
+            and same_shape
+            and self._skip_hd_strategy(images[0], config)
+        ):
+            return self._pad_forward_batch(images, masks, config)
+        return [self(image, mask, config) for image, mask in zip(images, masks)]
+
     def _crop_box(self, image, mask, box, config: InpaintRequest):
         """
 
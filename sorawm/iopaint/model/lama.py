@@ -33,6 +33,7 @@ class LaMa(InpaintModel):
     name = "lama"
     pad_mod = 8
     is_erase_model = True
+    support_batch = True
 
     @staticmethod
     def download():
@@ -65,6 +66,25 @@ class LaMa(InpaintModel):
         cur_res = cv2.cvtColor(cur_res, cv2.COLOR_RGB2BGR)
         return cur_res
 
+    def forward_batch(self, images, masks, config: InpaintRequest):
+        """Run N same-sized images as a single [N, C, H, W] batch
+        images: list of [H, W, C] RGB
+        masks: list of [H, W]
+        return: list of BGR IMAGE
+        """
+        image = np.stack([norm_img(image) for image in images])
+        mask = np.stack([norm_img(mask) for mask in masks])
+
+        mask = (mask > 0) * 1
+        image = torch.from_numpy(image).to(self.device)
+        mask = torch.from_numpy(mask).to(self.device)
+
+        inpainted_image = self.model(image, mask)
+
+        cur_res = inpainted_image.permute(0, 2, 3, 1).detach().cpu().numpy()
+        cur_res = np.clip(cur_res * 255, 0, 255).astype("uint8")
+        return [cv2.cvtColor(res, cv2.COLOR_RGB2BGR) for res in cur_res]
+
 
 class AnimeLaMa(LaMa):
     name = "anime-lama"
@@ -110,6 +110,30 @@ class ModelManager:
         self.enable_disable_lcm_lora(config)
         return self.model(image, mask, config).astype(np.uint8)
 
+    @torch.inference_mode()
+    def batch_call(self, images, masks, config: InpaintRequest):
+        """
+
+        Args:
+            images: list of [H, W, C] RGB, batched when they share the same size
+            masks: list of [H, W, 1] 255 means area to repaint
+            config:
+
+        Returns:
+            list of BGR images
+        """
+        if config.enable_controlnet:
+            self.switch_controlnet_method(config)
+        if config.enable_brushnet:
+            self.switch_brushnet_method(config)
+
+        self.enable_disable_powerpaint_v2(config)
+        self.enable_disable_lcm_lora(config)
+        return [
+            result.astype(np.uint8)
+            for result in self.model.batch_call(images, masks, config)
+        ]
+
     def scan_models(self) -> List[ModelInfo]:
         available_models = scan_models()
         self.available_models = {it.name: it for it in available_models}
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 import torch
 
@@ -8,6 +9,7 @@ from sorawm.iopaint.tests.utils import (
     check_device,
     current_dir,
     get_config,
+    get_data,
 )
 
 
@@ -33,6 +35,24 @@ def test_lama(device, strategy):
     )
 
 
+@pytest.mark.parametrize("device", ["cuda", "mps", "cpu"])
+@pytest.mark.parametrize(
+    "strategy", [HDStrategy.ORIGINAL, HDStrategy.RESIZE, HDStrategy.CROP]
+)
+def test_lama_batch(device, strategy):
+    check_device(device)
+    model = ModelManager(name="lama", device=device)
+    cfg = get_config(strategy=strategy)
+    img, mask = get_data()
+
+    results = model.batch_call([img, img], [mask, mask], cfg)
+    assert len(results) == 2
+    single = model(img, mask, cfg)
+    for res in results:
+        assert res.shape == single.shape
+        assert np.abs(res.astype(int) - single.astype(int)).max() <= 1
+
+
 @pytest.mark.parametrize("device", ["cuda", "cpu"])
 @pytest.mark.parametrize(
     "strategy", [HDStrategy.ORIGINAL, HDStrategy.RESIZE, HDStrategy.CROP]
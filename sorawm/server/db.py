@@ -1,9 +1,17 @@
+import asyncio
 from contextlib import asynccontextmanager
 
+from sqlalchemy import event, inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
-from sorawm.configs import SQLITE_PATH
+from sorawm.configs import (
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_PATH,
+    SQLITE_POOL_SIZE,
+    SQLITE_SYNCHRONOUS,
+)
 
 
 class Base(DeclarativeBase):
@@ -12,15 +20,65 @@ class Base(DeclarativeBase):
 
 DATABASE_URL = f"sqlite+aiosqlite:///{SQLITE_PATH}"
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    pool_size=SQLITE_POOL_SIZE,
+    max_overflow=SQLITE_POOL_SIZE,
+)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
 async_session_maker = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
 
+def _upgrade_schema(conn):
+    """Lightweight migration: create_all does not touch existing tables, so
+    add the columns and indexes that were introduced after a table was created."""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(
+                text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+            )
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_upgrade_schema)
+
+
+def migrate_db():
+    """Create and upgrade the schema from a process that does not serve, e.g.
+    before forking server workers, which would race on ALTER TABLE and CREATE
+    INDEX if each of them migrated a fresh database."""
+
+    async def migrate():
+        await init_db()
+        await engine.dispose()
+
+    asyncio.run(migrate())
 
 
 @asynccontextmanager
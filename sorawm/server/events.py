@@ -0,0 +1,44 @@
+import asyncio
+from typing import Dict, Set
+
+from sorawm.server.schemas import WMRemoveResults
+
+
+class TaskEventBroker:
+    """Fan-out of task state changes to the clients streaming them.
+
+    Every subscriber gets its own small queue. A client that falls behind only
+    loses intermediate states: when its queue is full the oldest state is
+    dropped, so it always ends up with the latest one. Only used from the
+    event loop thread.
+    """
+
+    def __init__(self, queue_size: int = 16) -> None:
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(task_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[task_id]
+
+    def has_subscribers(self, task_id: str) -> bool:
+        return task_id in self._subscribers
+
+    def publish(self, task_id: str, state: WMRemoveResults):
+        for queue in self._subscribers.get(task_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(state.model_copy())
+
+    @property
+    def num_subscribers(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
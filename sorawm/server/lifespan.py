@@ -36,4 +36,5 @@ async def lifespan(app: FastAPI):
         await asyncio.gather(model_loading_task, worker_task, return_exceptions=True)
     except Exception:
         pass
+    await worker.shutdown()
     logger.info("Application shutdown complete")
@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, Integer, String
+from sqlalchemy import DateTime, Index, Integer, String, bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column
 
 from sorawm.server.db import Base
@@ -8,6 +9,12 @@ from sorawm.server.db import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # listing by status, oldest first
+        Index("ix_tasks_status_created_at", "status", "created_at"),
+        # listing every task, newest first
+        Index("ix_tasks_created_at", "created_at"),
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True)
     video_path: Mapped[str] = mapped_column(String, nullable=False)
@@ -17,7 +24,23 @@ class Task(Base):
     download_url: Mapped[str] = mapped_column(String, nullable=True)
     error_message: Mapped[str] = mapped_column(String, nullable=True)  # Store error messages
     retry_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # Track retry attempts
+    checkpoint: Mapped[str] = mapped_column(String, nullable=True)  # JSON of the encoded output segments
+    video_sha256: Mapped[str] = mapped_column(String, nullable=True)  # Hash of the uploaded video
+    content_key: Mapped[str] = mapped_column(String, nullable=True, index=True)  # Video hash + output settings, for dedup
+    accessed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)  # Last download or dedup hit
+    lease_owner: Mapped[str] = mapped_column(String, nullable=True)  # Worker process running the task
+    lease_expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)  # Renewed by the owner's heartbeat
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.now, onupdate=datetime.now
     )
+
+
+# Built once so every lookup by id reuses the same compiled statement (and the
+# same prepared statement in sqlite3's per-connection cache)
+_TASK_BY_ID = select(Task).where(Task.id == bindparam("task_id"))
+
+
+async def get_task(session: AsyncSession, task_id: str) -> Task | None:
+    result = await session.execute(_TASK_BY_ID, {"task_id": task_id})
+    return result.scalar_one_or_none()
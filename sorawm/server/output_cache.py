@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+from loguru import logger
+from sqlalchemy import func, select, update
+
+from sorawm import configs
+from sorawm.server.db import get_session
+from sorawm.server.models import Task
+from sorawm.server.schemas import Status
+
+# settings that change the output video of a given upload
+_OUTPUT_SETTINGS = (
+    "DEFAULT_WATERMARK_REMOVE_MODEL",
+    "ROI_CLEAN",
+    "ROI_CONTEXT_MARGIN",
+    "DETECT_INTERVAL",
+    "DETECT_JUMP_THRESHOLD",
+    "SCENE_CHANGE_THRESHOLD",
+    "IMPUTATION_ENGINE",
+    "IMPUTATION_PENALTY",
+    "IMPUTATION_JUMP_THRESHOLD",
+    "IMPUTATION_KERNEL_MAX_FRAMES",
+    "ONLINE_IMPUTATION",
+    "IMPUTATION_LOOKAHEAD",
+    "ENCODER_PROFILE",
+    "CHECKPOINT_SEGMENT_SECONDS",
+    # caps the checkpoint segment length
+    "FRAME_STORE_MAX_RAM_MB",
+)
+
+
+def pipeline_fingerprint() -> str:
+    """Hash of the output settings and the detector weights version."""
+    settings = {name: getattr(configs, name) for name in _OUTPUT_SETTINGS}
+    weights_json = configs.WATER_MARK_DETECT_YOLO_WEIGHTS_HASH_JSON
+    if weights_json.exists():
+        settings["detector_weights"] = weights_json.read_text()
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+def content_key(video_sha256: str) -> str:
+    """Dedup key of an upload: same video processed with the same settings."""
+    return hashlib.sha256(f"{video_sha256}:{pipeline_fingerprint()}".encode()).hexdigest()
+
+
+def _file_sizes(paths: List[str]) -> List[int]:
+    sizes = []
+    for path in paths:
+        try:
+            sizes.append(Path(path).stat().st_size if path else 0)
+        except OSError:
+            sizes.append(0)
+    return sizes
+
+
+async def evict_outputs(
+    max_bytes: int = int(configs.OUTPUT_CACHE_MAX_GB * 1024**3),
+) -> List[Tuple[str, str]]:
+    """Delete the least recently used outputs until the rest fit in max_bytes.
+
+    A finished task counts its output and its uploaded source video, and
+    eviction deletes both, since the upload cannot be reused once its task
+    asks for a new submission. Evicted tasks stay FINISHED but lose their
+    output and download url. Returns the (task id, output path) pairs that
+    were evicted.
+    """
+    if max_bytes <= 0:
+        return []
+    last_used = func.coalesce(Task.accessed_at, Task.updated_at)
+    async with get_session() as session:
+        rows = (
+            await session.execute(
+                select(Task.id, Task.output_path, Task.video_path)
+                .where(Task.status == Status.FINISHED, Task.output_path.is_not(None))
+                .order_by(last_used.desc())
+            )
+        ).all()
+    output_sizes, upload_sizes = await asyncio.gather(
+        asyncio.to_thread(_file_sizes, [row.output_path for row in rows]),
+        asyncio.to_thread(_file_sizes, [row.video_path for row in rows]),
+    )
+
+    evicted = []
+    uploads = []
+    total = 0
+    for row, output_size, upload_size in zip(rows, output_sizes, upload_sizes):
+        total += output_size + upload_size
+        if total > max_bytes:
+            evicted.append((row.id, row.output_path))
+            uploads.append(row.video_path)
+    if not evicted:
+        return []
+
+    for path in [path for _, path in evicted] + uploads:
+        if path:
+            Path(path).unlink(missing_ok=True)
+    async with get_session() as session:
+        await session.execute(
+            update(Task)
+            .where(Task.id.in_([task_id for task_id, _ in evicted]))
+            .values(
+                output_path=None,
+                download_url=None,
+                error_message="Output was evicted from the cache, please submit the video again.",
+            )
+        )
+    logger.info(
+        f"Evicted {len(evicted)} output(s) and their uploads to stay under {max_bytes} bytes"
+    )
+    return evicted
+
+
+async def find_reusable_task(key: str) -> str | None:
+    """Id of a task with the same content key that finished with its output
+    still on disk, or that is still in flight."""
+    async with get_session() as session:
+        tasks = (
+            await session.execute(
+                select(Task)
+                .where(
+                    Task.content_key == key,
+                    Task.status.in_([Status.FINISHED, Status.PROCESSING]),
+                )
+                .order_by(Task.created_at.desc())
+            )
+        ).scalars().all()
+        for task in tasks:
+            if task.status == Status.PROCESSING:
+                return task.id
+            if task.output_path and Path(task.output_path).exists():
+                task.accessed_at = datetime.now()
+                return task.id
+    return None
@@ -0,0 +1,59 @@
+from typing import Dict, Set
+
+from sorawm.server.schemas import Status, WMRemoveResults
+
+
+class ProgressTable:
+    """Live state of the tasks being processed, served without the database.
+
+    The worker updates it on every progress callback and persists the changed
+    percentages in batches (see WMRemoveTaskWorker._flush_progress). Only used
+    from the event loop thread.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, WMRemoveResults] = {}
+        self._dirty: Set[str] = set()
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._tasks
+
+    def start(self, task_id: str, percentage: int, retry_count: int):
+        self._tasks[task_id] = WMRemoveResults(
+            percentage=percentage, status=Status.PROCESSING, retry_count=retry_count
+        )
+        self._dirty.discard(task_id)
+
+    def update(self, task_id: str, **fields) -> bool:
+        """Update a running task, returns whether any field changed. It is only
+        marked dirty when its percentage changed."""
+        state = self._tasks.get(task_id)
+        if state is None:
+            return False
+        percentage = state.percentage
+        changed = False
+        for name, value in fields.items():
+            if getattr(state, name) != value:
+                setattr(state, name, value)
+                changed = True
+        if state.percentage != percentage:
+            self._dirty.add(task_id)
+        return changed
+
+    def get(self, task_id: str) -> WMRemoveResults | None:
+        state = self._tasks.get(task_id)
+        return state.model_copy() if state is not None else None
+
+    def pop(self, task_id: str):
+        self._tasks.pop(task_id, None)
+        self._dirty.discard(task_id)
+
+    def take_dirty(self) -> Dict[str, int]:
+        """Percentages changed since the last call."""
+        dirty = {
+            task_id: self._tasks[task_id].percentage
+            for task_id in self._dirty
+            if task_id in self._tasks
+        }
+        self._dirty.clear()
+        return dirty
@@ -1,43 +1,64 @@
-from pathlib import Path
-from uuid import uuid4
+import asyncio
 
-import aiofiles
-from fastapi import APIRouter, BackgroundTasks, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
 
-from sorawm.server.schemas import WMRemoveResults
+from sorawm.configs import SSE_HEARTBEAT_SECONDS, UPLOAD_DEDUP
+from sorawm.server.output_cache import content_key, find_reusable_task
+from sorawm.server.schemas import Status, TaskSummary, WMRemoveResults, WorkerMetrics
+from sorawm.server.upload import UploadError, receive_upload
 from sorawm.server.worker import worker
 
 router = APIRouter()
 
 
-async def process_upload_and_queue(
-    task_id: str, video_content: bytes, video_path: Path
-):
-    try:
-        async with aiofiles.open(video_path, "wb") as f:
-            await f.write(video_content)
-        await worker.queue_task(task_id, video_path)
-    except Exception as e:
-        await worker.mark_task_error(task_id, str(e))
-
-
-@router.post("/submit_remove_task")
-async def submit_remove_task(
-    background_tasks: BackgroundTasks, video: UploadFile = File(...)
-):
+@router.post(
+    "/submit_remove_task",
+    # the body is parsed by receive_upload, documented here for /docs
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"video": {"type": "string", "format": "binary"}},
+                        "required": ["video"],
+                    }
+                }
+            },
+        }
+    },
+)
+async def submit_remove_task(request: Request):
     # Check if worker initialization failed
     if worker.initialization_error:
         raise HTTPException(
             status_code=503,
             detail=f"Service unavailable: Models failed to initialize: {worker.initialization_error}"
         )
-    
+
+    try:
+        video_path, video_sha256 = await receive_upload(request, worker.upload_dir)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to store upload: {e}")
+
+    key = content_key(video_sha256) if UPLOAD_DEDUP else None
+    if key is not None:
+        # the same video with the same settings: hand out the existing task
+        task_id = await find_reusable_task(key)
+        if task_id is not None:
+            video_path.unlink(missing_ok=True)
+            return {
+                "task_id": task_id,
+                "message": "Identical video already submitted, reusing its task.",
+            }
+
     task_id = await worker.create_task()
-    content = await video.read()
-    upload_filename = f"{uuid4()}_{video.filename}"
-    video_path = worker.upload_dir / upload_filename
-    background_tasks.add_task(process_upload_and_queue, task_id, content, video_path)
+    # queued only once the whole file is on disk
+    await worker.queue_task(task_id, video_path, video_sha256, key)
 
     message = "Task submitted."
     if not worker.is_ready():
@@ -55,6 +76,55 @@ async def get_results(remove_task_id: str) -> WMRemoveResults:
     return result
 
 
+@router.get("/tasks")
+async def list_tasks(
+    status: Status | None = None, limit: int = Query(100, ge=1, le=1000)
+) -> list[TaskSummary]:
+    return await worker.list_tasks(status, limit)
+
+
+@router.get("/metrics")
+async def get_metrics() -> WorkerMetrics:
+    return await worker.get_metrics()
+
+
+@router.get("/stream_results")
+async def stream_results(remove_task_id: str):
+    """Server-sent events with the task state: one `data:` event with the
+    current state, then one per change until the task is FINISHED or ERROR."""
+    # subscribe before reading the current state so no change is missed
+    events = worker.events.subscribe(remove_task_id)
+    result = await worker.get_task_status(remove_task_id)
+    if result is None:
+        worker.events.unsubscribe(remove_task_id, events)
+        raise HTTPException(status_code=404, detail="Task does not exist.")
+
+    async def event_stream():
+        state = result
+        try:
+            yield f"data: {state.model_dump_json()}\n\n"
+            while state.status not in (Status.FINISHED, Status.ERROR):
+                try:
+                    state = await asyncio.wait_for(events.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # the task may run in another server process, which only
+                    # shares its state through the database
+                    latest = await worker.get_task_status(remove_task_id)
+                    if latest is None or latest == state:
+                        yield ": keep-alive\n\n"
+                        continue
+                    state = latest
+                yield f"data: {state.model_dump_json()}\n\n"
+        finally:
+            worker.events.unsubscribe(remove_task_id, events)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/download/{task_id}")
 async def download_video(task_id: str):
     result = await worker.get_task_status(task_id)
@@ -1,3 +1,4 @@
+from datetime import datetime
 from enum import StrEnum
 
 from pydantic import BaseModel
@@ -16,3 +17,28 @@ class WMRemoveResults(BaseModel):
     download_url: str | None = None
     error_message: str | None = None  # Include error message in response
     retry_count: int | None = None  # Include retry count in response
+
+
+class TaskSummary(BaseModel):
+    task_id: str
+    status: Status
+    percentage: int
+    created_at: datetime
+
+
+class DeviceMetrics(BaseModel):
+    slots: int
+    limit: int
+    busy: int
+
+
+class WorkerMetrics(BaseModel):
+    queue_depth: int
+    slots: int
+    busy_slots: int
+    ready_slots: int
+    devices: dict[str, DeviceMetrics]
+    completed_tasks: int
+    failed_tasks: int
+    streaming_clients: int
+    average_processing_seconds: float | None = None
@@ -0,0 +1,129 @@
+import hashlib
+from pathlib import Path
+from typing import Tuple
+from uuid import uuid4
+
+import aiofiles
+from fastapi import Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from sorawm.configs import MAX_UPLOAD_MB
+
+# room for the multipart boundaries, part headers and small form fields
+_MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class UploadTooLarge(UploadError):
+    def __init__(self, max_bytes: int):
+        super().__init__(413, f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+
+
+async def receive_upload(
+    request: Request,
+    upload_dir: Path,
+    field: str = "video",
+    max_bytes: int = MAX_UPLOAD_MB * 1024 * 1024,
+) -> Tuple[Path, str]:
+    """Stream the `field` file of a multipart request body to upload_dir.
+
+    The body is parsed as it arrives and the file part is written and hashed
+    in that single pass, so at most one network chunk is held in memory and
+    an upload over max_bytes is cut off as soon as it gets there (or rejected
+    up front from its Content-Length). Returns the file path and its SHA-256.
+    The partial file is removed on any error.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            content_length = int(content_length)
+        except ValueError:
+            raise UploadError(400, "Invalid Content-Length header")
+        if content_length > max_bytes + _MULTIPART_OVERHEAD:
+            raise UploadTooLarge(max_bytes)
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadError(400, "Expected a multipart/form-data body")
+
+    # the parser callbacks are synchronous, their events are handled after each write
+    events = []
+    header_field = bytearray()
+    header_value = bytearray()
+    headers = {}
+
+    def on_header_end():
+        headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        events.append(("headers", dict(headers)))
+        headers.clear()
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_header_field": lambda data, start, end: header_field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: header_value.extend(data[start:end]),
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": lambda data, start, end: events.append(("data", bytes(data[start:end]))),
+            "on_part_end": lambda: events.append(("end", None)),
+        },
+    )
+
+    sha256 = hashlib.sha256()
+    video_path = None
+    file = None
+    size = 0
+    received = 0
+    done = False
+
+    async def handle_events():
+        nonlocal video_path, file, size, done
+        for kind, payload in events:
+            if kind == "headers":
+                _, options = parse_options_header(payload.get(b"content-disposition", b""))
+                filename = options.get(b"filename")
+                if done or options.get(b"name") != field.encode() or filename is None:
+                    continue
+                filename = Path(filename.decode("utf-8", errors="replace")).name or "video.mp4"
+                video_path = upload_dir / f"{uuid4()}_{filename}"
+                file = await aiofiles.open(video_path, "wb")
+            elif kind == "data" and file is not None:
+                size += len(payload)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                sha256.update(payload)
+                await file.write(payload)
+            elif kind == "end" and file is not None:
+                await file.close()
+                file = None
+                done = True
+        events.clear()
+
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes + _MULTIPART_OVERHEAD:
+                raise UploadTooLarge(max_bytes)
+            parser.write(chunk)
+            await handle_events()
+        parser.finalize()
+        await handle_events()
+        if not done:
+            raise UploadError(400, f"Missing '{field}' file in the upload")
+    except BaseException:
+        if file is not None:
+            await file.close()
+        if video_path is not None:
+            video_path.unlink(missing_ok=True)
+        raise
+    return video_path, sha256.hexdigest()
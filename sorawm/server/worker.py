@@ -1,23 +1,91 @@
 import asyncio
-from asyncio import Queue
-from datetime import datetime
+import json
+import os
+import socket
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Dict, List, Tuple
 from uuid import uuid4
 
 from loguru import logger
-from sqlalchemy import select
+from sqlalchemy import func, or_, select, update
 
-from sorawm.configs import WORKING_DIR
+from sorawm.configs import (
+    CHECKPOINT_DIR,
+    CHECKPOINT_SEGMENT_SECONDS,
+    PROGRESS_FLUSH_SECONDS,
+    QUEUE_POLL_SECONDS,
+    SERVER_DEVICE_CONCURRENCY,
+    SERVER_DEVICES,
+    SERVER_WORKER_SLOTS,
+    TASK_HEARTBEAT_SECONDS,
+    TASK_LEASE_SECONDS,
+    WORKING_DIR,
+)
 from sorawm.core import SoraWM
 from sorawm.server.db import get_session
-from sorawm.server.models import Task
-from sorawm.server.schemas import Status, WMRemoveResults
+from sorawm.server.events import TaskEventBroker
+from sorawm.server.models import Task, get_task
+from sorawm.server.output_cache import evict_outputs
+from sorawm.server.progress import ProgressTable
+from sorawm.server.schemas import (
+    DeviceMetrics,
+    Status,
+    TaskSummary,
+    WMRemoveResults,
+    WorkerMetrics,
+)
+from sorawm.utils.segment_utils import SegmentCheckpoint
+
+
+class LeaseLost(Exception):
+    """Another process claimed the task after this one's lease expired."""
 
 
 class WMRemoveTaskWorker:
-    def __init__(self) -> None:
-        self.queue = Queue()
-        self.sora_wm = None
+    """Runs queued tasks on a pool of SERVER_WORKER_SLOTS slots.
+
+    Every slot owns a SoraWM on its device (YOLO and LaMa are not safe to share
+    across threads) and takes one task at a time from the shared queue. Slots
+    are assigned round-robin to `devices`, and `device_concurrency` caps how
+    many of them run on one device at once (0 = all of its slots).
+
+    The queue is the tasks table: a queued task is PROCESSING without a live
+    lease, and a slot claims it by taking the lease in a single UPDATE, so
+    several server processes can share it. The lease is renewed while the task
+    runs and expires when its process dies, which puts the task back in the
+    queue.
+    """
+
+    def __init__(
+        self,
+        num_slots: int = SERVER_WORKER_SLOTS,
+        devices: List[str] = SERVER_DEVICES,
+        device_concurrency: int = SERVER_DEVICE_CONCURRENCY,
+    ) -> None:
+        # lease owner id, unique per process
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._task_queued = asyncio.Event()
+        # tasks whose lease was taken over, their run is stopped at the next progress report
+        self._lost_leases = set()
+        self.num_slots = max(1, num_slots)
+        # None lets SoraWM pick the best available device
+        devices = list(devices) or [None]
+        self.slot_devices = [devices[i % len(devices)] for i in range(self.num_slots)]
+        self.device_limits = {}
+        for device in set(self.slot_devices):
+            slots = self.slot_devices.count(device)
+            limit = min(device_concurrency, slots) if device_concurrency > 0 else slots
+            self.device_limits[_device_name(device)] = (limit, asyncio.Semaphore(limit))
+        self.models: List[SoraWM | None] = [None] * self.num_slots
+        self._slot_loaded = [asyncio.Event() for _ in range(self.num_slots)]
+        self.active_tasks: Dict[int, str] = {}
+        self.progress = ProgressTable()
+        self.events = TaskEventBroker()
+        self.completed_tasks = 0
+        self.failed_tasks = 0
+        self._processing_seconds = 0.0
         self.initialized = False
         self.initializing = False
         self.initialization_error = None
@@ -37,22 +105,40 @@ class WMRemoveTaskWorker:
         
         self.initializing = True
         try:
-            logger.info("Initializing SoraWM models...")
-            # Run model loading in thread pool to avoid blocking event loop
-            loop = asyncio.get_event_loop()
-            self.sora_wm = await asyncio.to_thread(SoraWM)
+            errors = []
+            # one slot at a time, loading several models at once only spikes memory
+            for slot, device in enumerate(self.slot_devices):
+                logger.info(
+                    f"Initializing SoraWM models of slot {slot} on {_device_name(device)}..."
+                )
+                try:
+                    # Run model loading in thread pool to avoid blocking event loop
+                    self.models[slot] = await asyncio.to_thread(SoraWM, device=device)
+                except Exception as e:
+                    errors.append(str(e))
+                    logger.error(f"Failed to initialize SoraWM models of slot {slot}: {e}")
+                finally:
+                    self._slot_loaded[slot].set()
+            if not self.is_ready():
+                self.initialization_error = errors[0]
+                raise RuntimeError(self.initialization_error)
             self.initialized = True
-            logger.info("SoraWM models initialized successfully")
-        except Exception as e:
-            self.initialization_error = str(e)
-            logger.error(f"Failed to initialize SoraWM models: {e}")
-            raise
+            logger.info(
+                f"SoraWM models initialized successfully on "
+                f"{self.num_slots - len(errors)}/{self.num_slots} slots"
+            )
         finally:
             self.initializing = False
     
+    async def shutdown(self):
+        """Stop the chunk worker processes of every slot's SoraWM."""
+        for sora_wm in self.models:
+            if sora_wm is not None:
+                await asyncio.to_thread(sora_wm.close)
+
     def is_ready(self) -> bool:
         """Check if worker is ready to process tasks."""
-        return self.initialized and self.sora_wm is not None
+        return any(sora_wm is not None for sora_wm in self.models)
 
     async def create_task(self) -> str:
         task_uuid = str(uuid4())
@@ -67,24 +153,37 @@ class WMRemoveTaskWorker:
         logger.info(f"Task {task_uuid} created with UPLOADING status")
         return task_uuid
 
-    async def queue_task(self, task_id: str, video_path: Path):
+    async def queue_task(
+        self,
+        task_id: str,
+        video_path: Path,
+        video_sha256: str | None = None,
+        content_key: str | None = None,
+    ):
         async with get_session() as session:
-            result = await session.execute(select(Task).where(Task.id == task_id))
-            task = result.scalar_one()
+            task = await get_task(session, task_id)
             task.video_path = str(video_path)
+            task.video_sha256 = video_sha256
+            task.content_key = content_key
             task.status = Status.PROCESSING
             task.percentage = 0
+            state = _task_results(task)
+        self.events.publish(task_id, state)
 
-        self.queue.put_nowait((task_id, video_path))
+        # wake up the idle slots of this process, the others find it when polling
+        self._task_queued.set()
         logger.info(f"Task {task_id} queued for processing: {video_path}")
 
     async def mark_task_error(self, task_id: str, error_msg: str):
         async with get_session() as session:
-            result = await session.execute(select(Task).where(Task.id == task_id))
-            task = result.scalar_one_or_none()
+            task = await get_task(session, task_id)
             if task:
                 task.status = Status.ERROR
                 task.percentage = 0
+                task.error_message = error_msg
+                state = _task_results(task)
+        if task:
+            self.events.publish(task_id, state)
         logger.error(f"Task {task_id} marked as ERROR: {error_msg}")
 
     def _is_retryable_error(self, error: Exception) -> bool:
@@ -123,97 +222,151 @@ class WMRemoveTaskWorker:
         return True
 
     async def run(self):
-        logger.info("Worker started, waiting for tasks...")
-        MAX_RETRIES = 3  # Maximum number of retry attempts
-        
-        while True:
-            task_uuid, video_path = await self.queue.get()
-            logger.info(f"Processing task {task_uuid}: {video_path}")
+        logger.info(
+            f"Worker {self.worker_id} started with {self.num_slots} slot(s), waiting for tasks..."
+        )
+        await self._requeue_orphaned_tasks()
+        await self._evict_outputs()
+        await asyncio.gather(
+            self._persist_progress(),
+            *(self._run_slot(slot) for slot in range(self.num_slots)),
+        )
 
-            # Wait for models to be initialized before processing
-            if not self.is_ready():
-                logger.warning(f"Models not ready yet, waiting for initialization...")
-                # Wait for initialization to complete
-                while not self.is_ready() and self.initialization_error is None:
-                    await asyncio.sleep(1)
-                
-                if self.initialization_error:
-                    logger.error(f"Cannot process task {task_uuid}: Models failed to initialize: {self.initialization_error}")
-                    await self.mark_task_error(task_uuid, f"Models not available: {self.initialization_error}")
-                    self.queue.task_done()
-                    continue
-
-            # Retry loop
-            retry_count = 0
-            success = False
-            
-            while retry_count <= MAX_RETRIES and not success:
+    async def _run_slot(self, slot: int):
+        device_name = _device_name(self.slot_devices[slot])
+        _, device_limit = self.device_limits[device_name]
+
+        # Wait for the models of this slot before taking tasks
+        await self._slot_loaded[slot].wait()
+        if self.models[slot] is None and (self.initialization_error is None or slot > 0):
+            # the other slots keep serving the queue
+            logger.warning(f"Slot {slot} on {device_name} has no models, not taking tasks")
+            return
+
+        while True:
+            async with device_limit:
+                task_uuid, video_path = await self._next_task()
+                heartbeat = asyncio.create_task(self._heartbeat(task_uuid))
                 try:
-                    if retry_count > 0:
-                        wait_time = min(2 ** retry_count, 60)  # Exponential backoff, max 60 seconds
-                        logger.info(f"Retrying task {task_uuid} (attempt {retry_count + 1}/{MAX_RETRIES + 1}) after {wait_time}s wait...")
-                        await asyncio.sleep(wait_time)
-                    
-                    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                    file_suffix = video_path.suffix
-                    output_filename = f"{task_uuid}_{timestamp}{file_suffix}"
-                    output_path = self.output_dir / output_filename
+                    if self.initialization_error:
+                        logger.error(f"Cannot process task {task_uuid}: Models failed to initialize: {self.initialization_error}")
+                        await self.mark_task_error(task_uuid, f"Models not available: {self.initialization_error}")
+                        continue
+                    logger.info(f"Processing task {task_uuid} on slot {slot} ({device_name}): {video_path}")
+                    self.active_tasks[slot] = task_uuid
+                    started = time.perf_counter()
+                    success = await self._process_task(
+                        self.models[slot], task_uuid, video_path
+                    )
+                    self._processing_seconds += time.perf_counter() - started
+                    if success:
+                        self.completed_tasks += 1
+                        await self._evict_outputs()
+                    else:
+                        self.failed_tasks += 1
+                finally:
+                    heartbeat.cancel()
+                    await self._release_lease(task_uuid)
+                    self._lost_leases.discard(task_uuid)
+                    self.active_tasks.pop(slot, None)
+                    self.progress.pop(task_uuid)
 
-                    async with get_session() as session:
-                        result = await session.execute(
-                            select(Task).where(Task.id == task_uuid)
-                        )
-                        task = result.scalar_one()
-                        task.status = Status.PROCESSING
-                        task.percentage = 10
-                        task.retry_count = retry_count  # Update retry count
-                        task.error_message = None  # Clear previous error
+    async def _process_task(
+        self, sora_wm: SoraWM, task_uuid: str, video_path: Path
+    ) -> bool:
+        MAX_RETRIES = 3  # Maximum number of retry attempts
 
-                    loop = asyncio.get_event_loop()
+        # Retry loop
+        retry_count = 0
+        success = False
+        checkpoint = None
+        
+        while retry_count <= MAX_RETRIES and not success:
+            try:
+                if retry_count > 0:
+                    wait_time = min(2 ** retry_count, 60)  # Exponential backoff, max 60 seconds
+                    logger.info(f"Retrying task {task_uuid} (attempt {retry_count + 1}/{MAX_RETRIES + 1}) after {wait_time}s wait...")
+                    await asyncio.sleep(wait_time)
+                
+                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+                file_suffix = video_path.suffix
+                output_filename = f"{task_uuid}_{timestamp}{file_suffix}"
+                output_path = self.output_dir / output_filename
 
-                    def progress_callback(percentage: int):
-                        asyncio.run_coroutine_threadsafe(
-                            self._update_progress(task_uuid, percentage), loop
-                        )
+                async with get_session() as session:
+                    task = await self._get_owned_task(session, task_uuid)
+                    task.status = Status.PROCESSING
+                    task.percentage = 10
+                    task.retry_count = retry_count  # Update retry count
+                    task.error_message = None  # Clear previous error
+                    # hashed during the upload, saves the detection cache a pass
+                    video_sha256 = task.video_sha256
+                self.progress.start(task_uuid, 10, retry_count)
+                self._publish_progress(task_uuid)
 
-                    await asyncio.to_thread(
-                        self.sora_wm.run, video_path, output_path, progress_callback
-                    )
+                loop = asyncio.get_event_loop()
 
-                    async with get_session() as session:
-                        result = await session.execute(
-                            select(Task).where(Task.id == task_uuid)
-                        )
-                        task = result.scalar_one()
-                        task.status = Status.FINISHED
-                        task.percentage = 100
-                        task.output_path = str(output_path)
-                        task.download_url = f"/download/{task_uuid}"
-                        task.error_message = None
-                        task.retry_count = retry_count  # Keep retry count for reference
-
-                    logger.info(
-                        f"Task {task_uuid} completed successfully on attempt {retry_count + 1}, output: {output_path}"
+                def progress_callback(percentage: int):
+                    if task_uuid in self._lost_leases:
+                        raise LeaseLost(f"Lost the lease of task {task_uuid}")
+                    # only touches memory, _persist_progress writes it out
+                    loop.call_soon_threadsafe(
+                        self._on_progress, task_uuid, percentage
                     )
-                    success = True
 
-                except Exception as e:
-                    error_msg = str(e)
-                    logger.error(f"Error processing task {task_uuid} (attempt {retry_count + 1}): {error_msg}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    
-                    # Check if error is retryable
-                    is_retryable = self._is_retryable_error(e)
-                    
+                # a retry picks up the segments the previous attempts finished
+                checkpoint = await self._load_checkpoint(task_uuid, loop)
+
+                await asyncio.to_thread(
+                    sora_wm.run,
+                    video_path,
+                    output_path,
+                    progress_callback,
+                    checkpoint=checkpoint,
+                    video_hash=video_sha256,
+                )
+
+                async with get_session() as session:
+                    task = await self._get_owned_task(session, task_uuid)
+                    task.status = Status.FINISHED
+                    task.percentage = 100
+                    task.output_path = str(output_path)
+                    task.download_url = f"/download/{task_uuid}"
+                    task.error_message = None
+                    task.retry_count = retry_count  # Keep retry count for reference
+                    task.checkpoint = None
+                    state = _task_results(task)
+                self.progress.pop(task_uuid)
+                self.events.publish(task_uuid, state)
+                if checkpoint is not None:
+                    checkpoint.cleanup()
+
+                logger.info(
+                    f"Task {task_uuid} completed successfully on attempt {retry_count + 1}, output: {output_path}"
+                )
+                success = True
+
+            except LeaseLost as e:
+                # the new owner runs the task and uses its checkpoint, leave both alone
+                logger.warning(f"Stopped task {task_uuid}: {e}")
+                break
+
+            except Exception as e:
+                error_msg = str(e)
+                logger.error(f"Error processing task {task_uuid} (attempt {retry_count + 1}): {error_msg}")
+                import traceback
+                logger.error(f"Traceback: {traceback.format_exc()}")
+                
+                # Check if error is retryable
+                is_retryable = self._is_retryable_error(e)
+                failed = False
+                
+                try:
                     async with get_session() as session:
-                        result = await session.execute(
-                            select(Task).where(Task.id == task_uuid)
-                        )
-                        task = result.scalar_one()
+                        task = await self._get_owned_task(session, task_uuid)
                         task.retry_count = retry_count + 1
                         task.error_message = error_msg
-                        
+                    
                         if not is_retryable or retry_count >= MAX_RETRIES:
                             # Non-retryable error or max retries reached
                             task.status = Status.ERROR
@@ -223,51 +376,346 @@ class WMRemoveTaskWorker:
                             logger.error(
                                 f"Task {task_uuid} failed permanently: {error_msg}"
                             )
-                            break
+                            task.checkpoint = None
+                            failed = True
+                            state = _task_results(task)
                         else:
                             # Retryable error, will retry
                             task.status = Status.PROCESSING  # Keep as processing for retry
+                            self.progress.update(
+                                task_uuid,
+                                retry_count=retry_count + 1,
+                                error_message=error_msg,
+                            )
+                            self._publish_progress(task_uuid)
                             logger.warning(
                                 f"Task {task_uuid} will be retried (attempt {retry_count + 1}/{MAX_RETRIES + 1}): {error_msg}"
                             )
-                    
-                    retry_count += 1
-                    # Continue to retry loop
+                except LeaseLost as lease_error:
+                    logger.warning(f"Stopped task {task_uuid}: {lease_error}")
+                    break
+
+                if failed:
+                    self.progress.pop(task_uuid)
+                    self.events.publish(task_uuid, state)
+                    if checkpoint is not None:
+                        checkpoint.cleanup()
+                    break
+                
+                retry_count += 1
+                # Continue to retry loop
 
-            self.queue.task_done()
+        return success
 
-    async def _update_progress(self, task_id: str, percentage: int):
+    async def _load_checkpoint(
+        self, task_id: str, loop: asyncio.AbstractEventLoop
+    ) -> SegmentCheckpoint | None:
+        """Segment checkpoint of a task, with the segments committed so far."""
+        if CHECKPOINT_SEGMENT_SECONDS <= 0:
+            return None
+        async with get_session() as session:
+            task = await get_task(session, task_id)
+            state = json.loads(task.checkpoint) if task.checkpoint else {}
+
+        def commit(checkpoint: SegmentCheckpoint):
+            # called from the processing thread, wait until the segment is recorded
+            future = asyncio.run_coroutine_threadsafe(
+                self._save_checkpoint(task_id, checkpoint.to_dict()), loop
+            )
+            try:
+                future.result(timeout=30)
+            except LeaseLost:
+                # stop before writing segments the new owner also writes
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to record checkpoint of task {task_id}: {e}")
+
+        return SegmentCheckpoint(
+            CHECKPOINT_DIR / task_id,
+            segment_frames=state.get("segment_frames"),
+            completed=state.get("completed", []),
+            on_commit=commit,
+        )
+
+    async def _save_checkpoint(self, task_id: str, state: dict):
+        async with get_session() as session:
+            task = await self._get_owned_task(session, task_id)
+            task.checkpoint = json.dumps(state)
+        logger.debug(f"Task {task_id} checkpoint: {state}")
+
+    async def _get_owned_task(self, session, task_id: str) -> Task:
+        """The task, as long as this process still holds its lease."""
+        task = await get_task(session, task_id)
+        if task is None or task.lease_owner != self.worker_id:
+            self._lost_leases.add(task_id)
+            raise LeaseLost(f"Lost the lease of task {task_id}")
+        return task
+
+    def _pending_filter(self, now: datetime):
+        """Queued tasks: PROCESSING with no lease or an expired one."""
+        return (
+            Task.status == Status.PROCESSING,
+            Task.video_path != "",
+            or_(Task.lease_owner.is_(None), Task.lease_expires_at < now),
+        )
+
+    async def _claim_task(self) -> Tuple[str, Path] | None:
+        """Lease the oldest queued task to this process."""
+        now = datetime.now()
+        oldest = (
+            select(Task.id)
+            .where(*self._pending_filter(now))
+            .order_by(Task.created_at)
+            .limit(1)
+            .scalar_subquery()
+        )
+        # one statement, so two processes can never claim the same task
+        claim = (
+            update(Task)
+            .where(Task.id == oldest)
+            .values(
+                lease_owner=self.worker_id,
+                lease_expires_at=now + timedelta(seconds=TASK_LEASE_SECONDS),
+            )
+            .returning(Task.id, Task.video_path)
+            .execution_options(synchronize_session=False)
+        )
+        async with get_session() as session:
+            row = (await session.execute(claim)).first()
+        if row is None:
+            return None
+        return row.id, Path(row.video_path)
+
+    async def _next_task(self) -> Tuple[str, Path]:
+        while True:
+            self._task_queued.clear()
+            try:
+                claimed = await self._claim_task()
+            except Exception as e:
+                logger.error(f"Error claiming a task: {e}")
+                claimed = None
+            if claimed is not None:
+                return claimed
+            try:
+                await asyncio.wait_for(self._task_queued.wait(), QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self, task_id: str):
+        while True:
+            await asyncio.sleep(TASK_HEARTBEAT_SECONDS)
+            try:
+                async with get_session() as session:
+                    result = await session.execute(
+                        update(Task)
+                        .where(Task.id == task_id, Task.lease_owner == self.worker_id)
+                        .values(
+                            lease_expires_at=datetime.now()
+                            + timedelta(seconds=TASK_LEASE_SECONDS)
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                if result.rowcount == 0:
+                    logger.warning(f"Worker {self.worker_id} lost the lease of task {task_id}")
+                    self._lost_leases.add(task_id)
+                    return
+            except Exception as e:
+                logger.error(f"Error renewing the lease of task {task_id}: {e}")
+
+    async def _release_lease(self, task_id: str):
+        # a task still PROCESSING here stopped unexpectedly, its lease is left
+        # to expire so it is claimed again after a delay instead of in a loop
+        try:
+            async with get_session() as session:
+                await session.execute(
+                    update(Task)
+                    .where(
+                        Task.id == task_id,
+                        Task.lease_owner == self.worker_id,
+                        Task.status != Status.PROCESSING,
+                    )
+                    .values(lease_owner=None, lease_expires_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+        except Exception as e:
+            logger.error(f"Error releasing the lease of task {task_id}: {e}")
+
+    def _is_dead_owner(self, owner: str) -> bool:
+        """Whether a lease owner is a process of this host that no longer runs."""
+        try:
+            host, pid, _ = owner.rsplit(":", 2)
+            pid = int(pid)
+        except ValueError:
+            return False
+        if host != socket.gethostname():
+            return False
+        if pid == os.getpid():
+            # the crashed process had our pid, e.g. pid 1 in a restarted container
+            return owner != self.worker_id
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    async def _requeue_orphaned_tasks(self):
+        """Put back the tasks whose owner died without releasing them: leases
+        of dead processes on this host right away, the others once expired."""
+        async with get_session() as session:
+            owners = (
+                await session.execute(
+                    select(Task.lease_owner)
+                    .where(Task.status == Status.PROCESSING, Task.lease_owner.is_not(None))
+                    .distinct()
+                )
+            ).scalars().all()
+            dead_owners = [owner for owner in owners if self._is_dead_owner(owner)]
+            result = await session.execute(
+                update(Task)
+                .where(
+                    Task.status == Status.PROCESSING,
+                    Task.lease_owner.is_not(None),
+                    or_(
+                        Task.lease_owner.in_(dead_owners),
+                        Task.lease_expires_at < datetime.now(),
+                    ),
+                )
+                .values(lease_owner=None, lease_expires_at=None)
+                .execution_options(synchronize_session=False)
+            )
+        if result.rowcount:
+            logger.info(f"Requeued {result.rowcount} orphaned task(s)")
+
+    async def _evict_outputs(self):
+        try:
+            await evict_outputs()
+        except Exception as e:
+            logger.error(f"Error evicting cached outputs: {e}")
+
+    def _on_progress(self, task_id: str, percentage: int):
+        if self.progress.update(task_id, percentage=percentage):
+            self._publish_progress(task_id)
+
+    def _publish_progress(self, task_id: str):
+        if self.events.has_subscribers(task_id):
+            self.events.publish(task_id, self.progress.get(task_id))
+
+    async def _persist_progress(self):
+        while True:
+            await asyncio.sleep(PROGRESS_FLUSH_SECONDS)
+            await self._flush_progress()
+
+    async def _flush_progress(self):
+        """Write the changed percentages of all running tasks in one transaction."""
+        pending = self.progress.take_dirty()
+        if not pending:
+            return
         try:
             async with get_session() as session:
-                result = await session.execute(select(Task).where(Task.id == task_id))
-                task = result.scalar_one_or_none()
-                if task:
-                    task.percentage = percentage
-                    logger.debug(f"Task {task_id} progress updated to {percentage}%")
+                for task_id, percentage in pending.items():
+                    # a task that already finished keeps its final percentage
+                    await session.execute(
+                        update(Task)
+                        .where(Task.id == task_id, Task.status == Status.PROCESSING)
+                        .values(percentage=percentage)
+                    )
+            logger.debug(f"Persisted progress of {len(pending)} task(s)")
         except Exception as e:
-            logger.error(f"Error updating progress for task {task_id}: {e}")
+            logger.error(f"Error persisting progress of {len(pending)} task(s): {e}")
 
     async def get_task_status(self, task_id: str) -> WMRemoveResults | None:
+        # running tasks are answered from memory
+        live = self.progress.get(task_id)
+        if live is not None:
+            return live
         async with get_session() as session:
-            result = await session.execute(select(Task).where(Task.id == task_id))
-            task = result.scalar_one_or_none()
+            task = await get_task(session, task_id)
             if task is None:
                 return None
-            return WMRemoveResults(
-                percentage=task.percentage,
+            return _task_results(task)
+
+    async def list_tasks(
+        self, status: Status | None = None, limit: int = 100
+    ) -> List[TaskSummary]:
+        """Most recent tasks first, served by the (status, created_at) index,
+        or by the created_at one when no status is given."""
+        query = select(Task).order_by(Task.created_at.desc()).limit(limit)
+        if status is not None:
+            query = query.where(Task.status == status)
+        async with get_session() as session:
+            tasks = (await session.execute(query)).scalars().all()
+        return [
+            TaskSummary(
+                task_id=task.id,
                 status=Status(task.status),
-                download_url=task.download_url,
-                error_message=task.error_message,  # Include error message
-                retry_count=task.retry_count,  # Include retry count
+                percentage=self.progress.get(task.id).percentage
+                if task.id in self.progress
+                else task.percentage,
+                created_at=task.created_at,
+            )
+            for task in tasks
+        ]
+
+    async def get_metrics(self) -> WorkerMetrics:
+        async with get_session() as session:
+            queue_depth = (
+                await session.execute(
+                    select(func.count())
+                    .select_from(Task)
+                    .where(*self._pending_filter(datetime.now()))
+                )
+            ).scalar_one()
+        devices = {}
+        for name, (limit, _) in self.device_limits.items():
+            slots = [
+                slot
+                for slot, device in enumerate(self.slot_devices)
+                if _device_name(device) == name
+            ]
+            devices[name] = DeviceMetrics(
+                slots=len(slots),
+                limit=limit,
+                busy=sum(slot in self.active_tasks for slot in slots),
             )
+        finished = self.completed_tasks + self.failed_tasks
+        return WorkerMetrics(
+            queue_depth=queue_depth,
+            slots=self.num_slots,
+            busy_slots=len(self.active_tasks),
+            ready_slots=sum(sora_wm is not None for sora_wm in self.models),
+            devices=devices,
+            completed_tasks=self.completed_tasks,
+            failed_tasks=self.failed_tasks,
+            streaming_clients=self.events.num_subscribers,
+            average_processing_seconds=(
+                self._processing_seconds / finished if finished else None
+            ),
+        )
 
     async def get_output_path(self, task_id: str) -> Path | None:
         async with get_session() as session:
-            result = await session.execute(select(Task).where(Task.id == task_id))
-            task = result.scalar_one_or_none()
+            task = await get_task(session, task_id)
             if task is None or task.output_path is None:
                 return None
+            # keeps recently downloaded outputs out of eviction
+            task.accessed_at = datetime.now()
             return Path(task.output_path)
 
 
+def _task_results(task: Task) -> WMRemoveResults:
+    return WMRemoveResults(
+        percentage=task.percentage,
+        status=Status(task.status),
+        download_url=task.download_url,
+        error_message=task.error_message,  # Include error message
+        retry_count=task.retry_count,  # Include retry count
+    )
+
+
+def _device_name(device: str | None) -> str:
+    return device or "auto"
+
+
 worker = WMRemoveTaskWorker()
@@ -0,0 +1,163 @@
+from typing import List, Tuple
+
+import numpy as np
+
+
+class BBoxTrack:
+    """Per-frame watermark bboxes as an int32[N, 4] array plus a validity mask.
+
+    Replaces the per-frame {"bbox": ...} dicts and the parallel tuple lists of
+    the detection pass. The track grows as frames are recorded, since the
+    probed frame count is only an estimate. Detection confidences and the
+    frames sparse detection skipped are kept alongside.
+    """
+
+    def __init__(self, capacity: int = 0):
+        capacity = max(capacity, 1)
+        self._boxes = np.zeros((capacity, 4), dtype=np.int32)
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._confidence = np.zeros(capacity, dtype=np.float32)
+        self._skipped = np.zeros(capacity, dtype=bool)
+        self._len = 0
+
+    @classmethod
+    def from_arrays(
+        cls,
+        boxes: np.ndarray,
+        valid: np.ndarray,
+        confidence: np.ndarray | None = None,
+        skipped: np.ndarray | None = None,
+    ) -> "BBoxTrack":
+        track = cls(len(valid))
+        track._len = len(valid)
+        track._boxes[: len(valid)] = boxes
+        track._valid[: len(valid)] = valid
+        if confidence is not None:
+            track._confidence[: len(valid)] = confidence
+        if skipped is not None:
+            track._skipped[: len(valid)] = skipped
+        return track
+
+    @classmethod
+    def from_list(cls, bboxes: List[Tuple[int, int, int, int] | None]) -> "BBoxTrack":
+        track = cls(len(bboxes))
+        for idx, bbox in enumerate(bboxes):
+            track.set(idx, bbox)
+        return track
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def boxes(self) -> np.ndarray:
+        return self._boxes[: self._len]
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self._valid[: self._len]
+
+    @property
+    def confidence(self) -> np.ndarray:
+        return self._confidence[: self._len]
+
+    @property
+    def skipped(self) -> np.ndarray:
+        return self._skipped[: self._len]
+
+    def set(
+        self,
+        idx: int,
+        bbox: Tuple[int, int, int, int] | None,
+        confidence: float | None = None,
+    ):
+        if idx >= len(self._valid):
+            self._grow(idx + 1)
+        self._len = max(self._len, idx + 1)
+        if bbox is None:
+            self._valid[idx] = False
+        else:
+            self._boxes[idx] = bbox
+            self._valid[idx] = True
+        if confidence is not None:
+            self._confidence[idx] = confidence
+
+    def set_skipped(self, idx: int):
+        """Record that frame idx was not run through the detector."""
+        self.set(idx, None)
+        self._skipped[idx] = True
+
+    def get(self, idx: int) -> Tuple[int, int, int, int] | None:
+        if idx >= self._len or not self._valid[idx]:
+            return None
+        return tuple(int(v) for v in self._boxes[idx])
+
+    def centers(self) -> np.ndarray:
+        """int32[N, 2] bbox centers, only meaningful where valid."""
+        boxes = self.boxes
+        return np.stack(
+            [(boxes[:, 0] + boxes[:, 2]) // 2, (boxes[:, 1] + boxes[:, 3]) // 2], axis=1
+        )
+
+    def interval_average(self, bkps: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Average bbox of each interval [bkps[i], bkps[i + 1]), with a mask of
+        the intervals that contain at least one valid bbox."""
+        bkps = np.asarray(bkps)
+        n_intervals = max(len(bkps) - 1, 0)
+        idxs = np.flatnonzero(self.valid)
+        intervals = np.searchsorted(bkps, idxs, side="right") - 1
+        inside = (intervals >= 0) & (intervals < n_intervals)
+        idxs, intervals = idxs[inside], intervals[inside]
+        sums = np.zeros((n_intervals, 4), dtype=np.int64)
+        np.add.at(sums, intervals, self._boxes[idxs])
+        counts = np.bincount(intervals, minlength=n_intervals)
+        has_bbox = counts > 0
+        averages = np.zeros((n_intervals, 4), dtype=np.int32)
+        # truncated like int(np.mean(...)) was
+        averages[has_bbox] = (sums[has_bbox] / counts[has_bbox, None]).astype(np.int32)
+        return averages, has_bbox
+
+    def fill(self, idxs: np.ndarray, bkps: List[int]) -> np.ndarray:
+        """Fill frames idxs with the average bbox of their interval.
+
+        Frames whose interval has no valid bbox take the previous frame's bbox
+        (possibly just filled) or else the next frame's. Returns the idxs that
+        got a bbox from their interval average.
+        """
+        idxs = np.asarray(idxs, dtype=int)
+        if len(idxs) == 0:
+            return idxs
+        averages, has_bbox = self.interval_average(bkps)
+        intervals = find_intervals(idxs, bkps)
+        from_average = has_bbox[intervals] if len(has_bbox) else np.zeros(len(idxs), bool)
+        fallback = np.sort(idxs[~from_average])
+        # the next frame as the frame-by-frame fill saw it, before any of idxs
+        # after the current one was filled
+        after = np.minimum(fallback + 1, self._len - 1)
+        after_valid = self._valid[after].copy()
+        after_boxes = self._boxes[after].copy()
+        self._boxes[idxs[from_average]] = averages[intervals[from_average]]
+        self._valid[idxs[from_average]] = True
+
+        # fallback strategy, in frame order so a filled frame feeds the next one
+        for idx, next_valid, next_box in zip(fallback, after_valid, after_boxes):
+            before = max(idx - 1, 0)
+            if self._valid[before]:
+                self.set(idx, self._boxes[before])
+            elif next_valid:
+                self.set(idx, next_box)
+        return idxs[from_average]
+
+    def _grow(self, size: int):
+        capacity = max(size, 2 * len(self._valid))
+        for name in ("_boxes", "_valid", "_confidence", "_skipped"):
+            old = getattr(self, name)
+            new = np.zeros((capacity, *old.shape[1:]), dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+
+def find_intervals(idxs: np.ndarray, bkps: List[int]) -> np.ndarray:
+    """Interval index i with bkps[i] <= idx < bkps[i + 1] of every idx, clipped
+    to the first/last interval."""
+    intervals = np.searchsorted(np.asarray(bkps), idxs, side="right") - 1
+    return np.clip(intervals, 0, max(len(bkps) - 2, 0))
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from sorawm.configs import (
+    DETECT_JUMP_THRESHOLD,
+    DETECTION_CACHE_DIR,
+    SCENE_CHANGE_THRESHOLD,
+    WATER_MARK_DETECT_YOLO_WEIGHTS,
+    WATER_MARK_DETECT_YOLO_WEIGHTS_HASH_JSON,
+)
+from sorawm.utils.bbox_track import BBoxTrack
+from sorawm.utils.download_utils import generate_sha256_hash
+
+# bump when the stored arrays change meaning
+CACHE_FORMAT_VERSION = 1
+
+
+@lru_cache(maxsize=256)
+def _file_sha256_cached(path: str, mtime_ns: int, size: int) -> str:
+    return generate_sha256_hash(Path(path))
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of the file content, memoized by path + mtime + size."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    return _file_sha256_cached(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def detector_weights_hash() -> str:
+    """Hash of the YOLO weights, as recorded by download_detector_weights."""
+    if WATER_MARK_DETECT_YOLO_WEIGHTS_HASH_JSON.exists():
+        try:
+            with WATER_MARK_DETECT_YOLO_WEIGHTS_HASH_JSON.open("r") as f:
+                weights_hash = json.load(f).get("sha256")
+            if weights_hash:
+                return weights_hash
+        except (OSError, ValueError):
+            pass
+    return file_sha256(WATER_MARK_DETECT_YOLO_WEIGHTS)
+
+
+def detection_params(detect_interval: int) -> dict:
+    """The settings that change which frames are detected, part of the key."""
+    params = {"detect_interval": detect_interval}
+    if detect_interval > 1:
+        params["jump_threshold"] = DETECT_JUMP_THRESHOLD
+        params["scene_change_threshold"] = SCENE_CHANGE_THRESHOLD
+    return params
+
+
+def detection_cache_key(
+    video_path: Path,
+    start: int,
+    end: int,
+    params: dict,
+    video_hash: str | None = None,
+) -> str:
+    """Cache key of the detections of frames [start, end) of a video.
+
+    The key covers the video content rather than its path, the detector
+    weights and every parameter that changes which frames are detected.
+    Pass video_hash when the content hash is already known.
+    """
+    key = {
+        "version": CACHE_FORMAT_VERSION,
+        "video": video_hash or file_sha256(video_path),
+        "weights": detector_weights_hash(),
+        "start": start,
+        "end": end,
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def load_detections(key: str, cache_dir: Path = DETECTION_CACHE_DIR) -> BBoxTrack | None:
+    cache_path = cache_dir / f"{key}.npz"
+    if not cache_path.exists():
+        return None
+    try:
+        with np.load(cache_path) as data:
+            return BBoxTrack.from_arrays(
+                data["boxes"], data["valid"], data["confidence"], data["skipped"]
+            )
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable detection cache {cache_path}: {e}")
+        return None
+
+
+def save_detections(key: str, track: BBoxTrack, cache_dir: Path = DETECTION_CACHE_DIR):
+    """Store the raw detections (before imputation) of a track."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=".npz.tmp", dir=cache_dir)
+    try:
+        with open(fd, "wb") as f:
+            np.savez(
+                f,
+                boxes=track.boxes,
+                valid=track.valid,
+                confidence=track.confidence,
+                skipped=track.skipped,
+            )
+        # atomic, so a concurrent reader never sees a partial file
+        os.replace(temp_path, cache_dir / f"{key}.npz")
+    except Exception:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
@@ -10,9 +10,13 @@ from sorawm.configs import WATER_MARK_DETECT_YOLO_WEIGHTS, WATER_MARK_DETECT_YOL
 DETECTOR_URL = "https://github.com/linkedlist771/SoraWatermarkCleaner/releases/download/V0.0.1/best.pt"
 REMOTE_MODEL_VERSION_URL = "https://raw.githubusercontent.com/linkedlist771/SoraWatermarkCleaner/refs/heads/main/model_version.json"
 
-def generate_sha256_hash(file_path: Path) -> str:
+def generate_sha256_hash(file_path: Path, chunk_size: int = 1024 * 1024) -> str:
+    # hashed in chunks, videos can be far larger than the weights
+    sha256 = hashlib.sha256()
     with open(file_path, "rb") as f:
-        return hashlib.sha256(f.read()).hexdigest()
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
 
 def download_detector_weights(force_download: bool = False):
     ## 1. check if model exists and if we need to download
@@ -0,0 +1,124 @@
+import os
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+# Rough libx264 speed per core (megapixels/second) on a modern x86 core, used by
+# the auto profile to find the slowest preset that still keeps up
+X264_PRESET_MPIX_PER_CORE = {
+    "ultrafast": 60.0,
+    "superfast": 40.0,
+    "veryfast": 25.0,
+    "faster": 15.0,
+    "fast": 10.0,
+    "medium": 7.0,
+}
+# encoder capacity kept in reserve so it never becomes the bottleneck
+AUTO_HEADROOM = 1.5
+
+# audio codecs each output container takes as-is, anything else is re-encoded
+_MP4_AUDIO = {"aac", "mp3", "ac3", "eac3", "alac", "opus", "flac"}
+AUDIO_COPY_CODECS = {
+    ".mp4": _MP4_AUDIO,
+    ".m4v": _MP4_AUDIO,
+    ".mov": _MP4_AUDIO | {"pcm_s16le", "pcm_s24le", "pcm_f32le"},
+    ".mkv": None,  # matroska takes any audio codec
+    ".webm": {"opus", "vorbis"},
+    ".avi": {"mp3", "ac3", "pcm_s16le"},
+    ".flv": {"aac", "mp3"},
+}
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """libx264 settings for the output pipe, None leaves the x264 default."""
+
+    name: str
+    preset: str | None = None
+    tune: str | None = None
+    crf: int = 20
+    # encode at 1.2x the source bitrate when the source reports one, else use crf
+    use_source_bitrate: bool = True
+    threads: int | None = None
+    lookahead: int | None = None
+
+
+ENCODER_PROFILES = {
+    # previous behaviour: x264 defaults, source bitrate or CRF 20
+    "default": EncoderProfile("default"),
+    "throughput": EncoderProfile("throughput", preset="veryfast", lookahead=10),
+    "archival": EncoderProfile(
+        "archival", preset="slow", crf=18, use_source_bitrate=False
+    ),
+}
+
+
+def get_encoder_profile(profile: "str | EncoderProfile") -> EncoderProfile:
+    if isinstance(profile, EncoderProfile):
+        return profile
+    if profile == "auto":
+        return EncoderProfile("auto")
+    if profile in X264_PRESET_MPIX_PER_CORE:
+        return EncoderProfile(profile, preset=profile)
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(
+            f"Unknown encoder profile: {profile}. Available profiles: "
+            f"{['auto', *ENCODER_PROFILES, *X264_PRESET_MPIX_PER_CORE]}"
+        )
+    return ENCODER_PROFILES[profile]
+
+
+def select_auto_profile(
+    width: int, height: int, target_fps: float, threads: int | None = None
+) -> EncoderProfile:
+    """Pick the slowest preset whose estimated speed keeps up with target_fps."""
+    threads = threads or os.cpu_count() or 1
+    required = width * height * target_fps / 1e6 * AUTO_HEADROOM
+    chosen = "ultrafast"
+    for preset, mpix_per_core in X264_PRESET_MPIX_PER_CORE.items():
+        if mpix_per_core * threads >= required:
+            chosen = preset
+    return EncoderProfile("auto", preset=chosen, threads=threads, lookahead=10)
+
+
+def build_encoder_kwargs(
+    profile: EncoderProfile, fps: float, original_bitrate: str | None
+) -> dict:
+    # Use explicit parameters that work across all FFmpeg versions
+    output_kwargs = {
+        "vcodec": "libx264",
+        "pix_fmt": "yuv420p",
+        "r": fps,  # Match input framerate
+    }
+    if profile.use_source_bitrate and original_bitrate:
+        # Use bitrate if available from source
+        bitrate = int(int(original_bitrate) * 1.2)
+        output_kwargs["video_bitrate"] = str(bitrate)
+        output_kwargs["bufsize"] = str(bitrate * 2)  # Buffer size
+    else:
+        # Quality-based encoding (18-28 range, lower = better)
+        output_kwargs["crf"] = str(profile.crf)
+    if profile.preset:
+        output_kwargs["preset"] = profile.preset
+    if profile.tune:
+        output_kwargs["tune"] = profile.tune
+    if profile.threads:
+        output_kwargs["threads"] = str(profile.threads)
+    if profile.lookahead is not None:
+        output_kwargs["rc-lookahead"] = str(profile.lookahead)
+    return output_kwargs
+
+
+def with_threads(profile: EncoderProfile, threads: int | None) -> EncoderProfile:
+    if threads is None or profile.threads is not None:
+        return profile
+    return replace(profile, threads=threads)
+
+
+def build_audio_kwargs(output_path: Path, audio_codec: str | None) -> dict:
+    """Stream copy the source audio when the output container supports its codec."""
+    allowed = AUDIO_COPY_CODECS.get(Path(output_path).suffix.lower(), set())
+    if audio_codec and (allowed is None or audio_codec in allowed):
+        return {"acodec": "copy"}
+    if Path(output_path).suffix.lower() == ".webm":
+        return {"acodec": "libopus"}
+    return {"acodec": "aac"}
@@ -0,0 +1,160 @@
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from sorawm.configs import FRAME_STORE_MAX_DISK_MB, FRAME_STORE_MAX_RAM_MB, SCRATCH_DIR
+
+
+class FrameStoreFull(Exception):
+    """A frame had to spill past the disk budget of the store."""
+
+
+class FrameStore:
+    """Decode-once frame storage shared by the detection and the clean pass.
+
+    The most recent frames live in a fixed-size RAM ring buffer. When a frame
+    is evicted from the ring it spills to a memory-mapped scratch file, so
+    memory stays bounded no matter how long the video is, and spilling more
+    than max_disk_mb (None = unbounded) raises FrameStoreFull. The ring holds at
+    least min_ram_frames, even past max_ram_mb. Frames returned from
+    the ring are views, copy them if appends continue while they are in use.
+    One thread may append while another reads with get(idx, copy=True).
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        max_ram_mb: int = FRAME_STORE_MAX_RAM_MB,
+        scratch_dir: Path = SCRATCH_DIR,
+        max_disk_mb: int | None = FRAME_STORE_MAX_DISK_MB,
+        min_ram_frames: int = 1,
+    ):
+        self.width = width
+        self.height = height
+        self.frame_shape = (height, width, 3)
+        self.frame_size = width * height * 3
+        self.ram_frames = max(min_ram_frames, self.ram_capacity(width, height, max_ram_mb))
+        self.scratch_dir = scratch_dir
+        self.max_disk_frames = (
+            None if max_disk_mb is None else (max_disk_mb * 1024 * 1024) // self.frame_size
+        )
+
+        self._ring: np.ndarray | None = None
+        self._count = 0
+        self._released = 0
+        self._spill_file = None
+        self._spill_path: Path | None = None
+        self._spill_view: np.ndarray | None = None
+        self._spilled = 0
+        self._spill_count = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def ram_capacity(
+        width: int, height: int, max_ram_mb: int = FRAME_STORE_MAX_RAM_MB
+    ) -> int:
+        """Frames of this size that fit in max_ram_mb, at least one."""
+        return max(1, (max_ram_mb * 1024 * 1024) // (width * height * 3))
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self) -> float:
+        """Frames that can be stored before appends raise FrameStoreFull."""
+        if self.max_disk_frames is None:
+            return float("inf")
+        return self.ram_frames + self.max_disk_frames
+
+    def __iter__(self):
+        for idx in range(self._count):
+            yield self[idx]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def append(self, frame: np.ndarray) -> int:
+        with self._lock:
+            return self._append(frame)
+
+    def _append(self, frame: np.ndarray) -> int:
+        if self._ring is None:
+            self._ring = np.empty((self.ram_frames, *self.frame_shape), dtype=np.uint8)
+        idx = self._count
+        if idx >= self.ram_frames:
+            evicted = idx - self.ram_frames
+            if evicted >= self._released:
+                self._spill(evicted, self._ring[evicted % self.ram_frames])
+        self._ring[idx % self.ram_frames] = frame
+        self._count += 1
+        return idx
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        return self.get(idx)
+
+    def get(self, idx: int, copy: bool = False) -> np.ndarray:
+        with self._lock:
+            frame = self._get(idx)
+            return frame.copy() if copy else frame
+
+    def _get(self, idx: int) -> np.ndarray:
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError(f"frame {idx} out of range [0, {self._count})")
+        if idx < self._released:
+            raise IndexError(f"frame {idx} has already been released")
+        if idx >= self._count - self.ram_frames:
+            return self._ring[idx % self.ram_frames]
+        return self._read_spilled(idx)
+
+    def release(self, upto: int):
+        """Mark frames [0, upto) as consumed so they are never spilled to disk."""
+        with self._lock:
+            self._released = max(self._released, min(upto, self._count))
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        self._spill_view = None
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        if self._spill_path is not None:
+            self._spill_path.unlink(missing_ok=True)
+            self._spill_path = None
+        self._ring = None
+
+    def _spill(self, idx: int, frame: np.ndarray):
+        if self.max_disk_frames is not None and self._spill_count >= self.max_disk_frames:
+            raise FrameStoreFull(
+                f"frame {idx} would spill past {self.max_disk_frames} frames on disk"
+            )
+        if self._spill_file is None:
+            self.scratch_dir.mkdir(parents=True, exist_ok=True)
+            fd, path = tempfile.mkstemp(suffix=".frames", dir=self.scratch_dir)
+            self._spill_file = open(fd, "w+b")
+            self._spill_path = Path(path)
+        self._spill_file.seek(idx * self.frame_size)
+        self._spill_file.write(frame.tobytes())
+        self._spilled = max(self._spilled, idx + 1)
+        self._spill_count += 1
+
+    def _read_spilled(self, idx: int) -> np.ndarray:
+        if self._spill_view is None or idx >= len(self._spill_view):
+            self._spill_file.flush()
+            self._spill_view = np.memmap(
+                self._spill_path,
+                dtype=np.uint8,
+                mode="r",
+                shape=(self._spilled, *self.frame_shape),
+            )
+        return self._spill_view[idx]
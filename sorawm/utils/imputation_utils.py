@@ -1,52 +1,311 @@
 import ruptures as rpt
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
+from collections import deque
 from typing import List, Tuple
 
+from sorawm.configs import (
+    IMPUTATION_ENGINE,
+    IMPUTATION_JUMP_THRESHOLD,
+    IMPUTATION_KERNEL_MAX_FRAMES,
+    IMPUTATION_LOOKAHEAD,
+    IMPUTATION_PENALTY,
+)
+from sorawm.utils.bbox_track import BBoxTrack, find_intervals
 
-def find_2d_data_bkps(X: List[Tuple[int, int]]) -> List[int]:
-    X_clean = [point if point is not None else (np.nan, np.nan) for point in X]
-    X = np.array(X_clean, dtype=float)
-    X = pd.DataFrame(X).interpolate("linear").bfill().ffill().to_numpy()
-    X_std = StandardScaler().fit_transform(X)
-    algo = rpt.KernelCPD(kernel="rbf", jump=1).fit(X_std)
-    bkps = algo.predict(pen=10)
-    return bkps[:-1]
+CPD_ENGINES = ["auto", "kernel", "pelt", "jump"]
+# longest series PELT runs on directly, longer ones are segmented on block means
+_PELT_MAX_POINTS = 1000
+
+
+def _as_center_array(
+    X: List[Tuple[int, int] | None] | np.ndarray, valid: np.ndarray | None
+) -> Tuple[np.ndarray, np.ndarray]:
+    if valid is not None:
+        return np.asarray(X, dtype=float), np.asarray(valid, dtype=bool)
+    valid = np.array([point is not None for point in X], dtype=bool)
+    centers = np.zeros((len(X), 2))
+    if valid.any():
+        centers[valid] = [point for point in X if point is not None]
+    return centers, valid
+
+
+def _interpolate_centers(
+    centers: np.ndarray, valid: np.ndarray, hold: bool = False
+) -> np.ndarray:
+    """Fill missing centers linearly, or with the last known one when `hold`,
+    keeping the first/last known value at the ends."""
+    positions = np.arange(len(centers))
+    centers = centers[valid]
+    if hold:
+        # index of the last known center at or before every frame
+        known = np.maximum.accumulate(np.where(valid, np.cumsum(valid) - 1, 0))
+        return centers[known]
+    return np.stack(
+        [np.interp(positions, positions[valid], centers[:, dim]) for dim in range(2)],
+        axis=1,
+    )
+
+
+def _standardize(X: np.ndarray) -> np.ndarray:
+    # same as sklearn's StandardScaler: zero mean, unit variance, constant columns kept at 0
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    return (X - X.mean(axis=0)) / std
+
+
+class _L2Cost:
+    """Sum of squared deviations from the mean of X[start:end] in O(1)."""
+
+    def __init__(self, X: np.ndarray):
+        self.csum = np.vstack([np.zeros((1, X.shape[1])), np.cumsum(X, axis=0)])
+        self.csum_sq = np.concatenate([[0.0], np.cumsum((X**2).sum(axis=1))])
+
+    def __call__(self, starts, ends):
+        sums = self.csum[ends] - self.csum[starts]
+        lengths = np.asarray(ends) - np.asarray(starts)
+        return (
+            self.csum_sq[ends]
+            - self.csum_sq[starts]
+            - (sums**2).sum(axis=-1) / lengths
+        )
+
+
+def _pelt_l2(X: np.ndarray, pen: float, min_size: int = 2) -> List[int]:
+    n = len(X)
+    if n < 2 * min_size:
+        return [n]
+    cost = _L2Cost(X)
+    best = np.full(n + 1, np.inf)
+    best[0] = -pen
+    last = np.zeros(n + 1, dtype=int)
+    candidates = np.empty(0, dtype=int)
+    for end in range(min_size, n + 1):
+        new_start = end - min_size
+        if new_start == 0 or new_start >= min_size:
+            candidates = np.append(candidates, new_start)
+        costs = best[candidates] + cost(candidates, end)
+        arg = int(np.argmin(costs))
+        best[end] = costs[arg] + pen
+        last[end] = candidates[arg]
+        # a start that cannot beat the optimum now never will (PELT pruning)
+        candidates = candidates[costs <= best[end]]
+
+    bkps = []
+    end = n
+    while end > 0:
+        bkps.append(end)
+        end = int(last[end])
+    return bkps[::-1]
+
+
+def _pelt_l2_bkps(X: np.ndarray, pen: float) -> List[int]:
+    """PELT with an L2 (mean shift) cost, in the ruptures bkps format.
+
+    PELT pruning keeps every start inside a long flat segment, so on its own it
+    is quadratic for the few-changes series seen here. Long series are
+    therefore segmented on block means (at most _PELT_MAX_POINTS of them, with
+    the penalty scaled to match), and each breakpoint is then moved to the
+    exact frame minimizing the cost of its two neighbouring segments. All
+    steps are linear in the number of frames.
+    """
+    n = len(X)
+    block = -(-n // _PELT_MAX_POINTS)
+    if block == 1:
+        return _pelt_l2(X, pen)
+
+    n_blocks = -(-n // block)
+    padded = np.concatenate([X, np.repeat(X[-1:], n_blocks * block - n, axis=0)])
+    coarse = _pelt_l2(padded.reshape(n_blocks, block, -1).mean(axis=1), pen / block)
+
+    cost = _L2Cost(X)
+    bkps = [min(bkp * block, n) for bkp in coarse]
+    for i in range(len(bkps) - 1):
+        left = bkps[i - 1] if i > 0 else 0
+        right = bkps[i + 1]
+        positions = np.arange(
+            max(bkps[i] - block + 1, left + 1), min(bkps[i] + block, right)
+        )
+        if len(positions):
+            total = cost(np.full_like(positions, left), positions) + cost(
+                positions, np.full_like(positions, right)
+            )
+            bkps[i] = int(positions[np.argmin(total)])
+
+    # a block straddling a change leaves a short extra segment, drop the
+    # breakpoints that do not pay for their penalty any more
+    merged = [0]
+    for i, bkp in enumerate(bkps[:-1]):
+        right = bkps[i + 1]
+        gain = cost(merged[-1], right) - cost(merged[-1], bkp) - cost(bkp, right)
+        if gain > pen:
+            merged.append(bkp)
+    return merged[1:] + [n]
+
+
+class StreamingJumpCPD:
+    """Incremental change points on a center series: a new segment starts where
+    the center moves more than `threshold` pixels from one known frame to the
+    next. Breakpoints closer than `min_size` frames to the previous one are
+    dropped, so an isolated bad detection does not split a segment in three.
+    """
+
+    def __init__(self, threshold: float = IMPUTATION_JUMP_THRESHOLD, min_size: int = 2):
+        self.threshold = threshold
+        self.min_size = min_size
+        self.bkps = []
+        self._last_center = None
+        self._last_bkp = 0
+
+    def update(self, idx: int, center: Tuple[int, int] | None) -> int | None:
+        """Feed the center of frame idx (None when unknown), in frame order.
+        Returns the new breakpoint when frame idx starts a segment."""
+        if center is None:
+            return None
+        last_center, self._last_center = self._last_center, center
+        if last_center is None:
+            return None
+        jump = np.hypot(center[0] - last_center[0], center[1] - last_center[1])
+        if jump <= self.threshold or idx - self._last_bkp < self.min_size:
+            return None
+        self.bkps.append(idx)
+        self._last_bkp = idx
+        return idx
+
+
+def _jump_bkps(
+    centers: np.ndarray, valid: np.ndarray, threshold: float, min_size: int = 2
+) -> List[int]:
+    # StreamingJumpCPD over the whole series, vectorized up to the min_size check
+    known = np.flatnonzero(valid)
+    steps = np.diff(centers[known], axis=0)
+    jumps = known[1:][np.hypot(steps[:, 0], steps[:, 1]) > threshold]
+    bkps = []
+    for idx in jumps:
+        if idx - (bkps[-1] if bkps else 0) >= min_size:
+            bkps.append(int(idx))
+    return bkps + [len(centers)]
+
+
+class OnlineBBoxImputer:
+    """Fill missing bboxes causally, with at most `lookahead` frames of delay.
+
+    Bboxes are pushed in frame order and come back out in frame order. Segments
+    are split by StreamingJumpCPD. A frame without a bbox gets the average bbox
+    of its segment as known when it leaves, which is final once the segment has
+    closed and otherwise covers up to `lookahead` frames after it. A segment
+    without any bbox yet falls back to the previous frame's bbox, then to the
+    next one's.
+    """
+
+    def __init__(
+        self,
+        lookahead: int = IMPUTATION_LOOKAHEAD,
+        threshold: float = IMPUTATION_JUMP_THRESHOLD,
+    ):
+        self.lookahead = max(1, lookahead)
+        self.filled_frames = 0
+        self._cpd = StreamingJumpCPD(threshold)
+        self._pending = deque()  # (idx, bbox, segment start)
+        self._segment = 0
+        self._segment_stats = {}  # segment start -> [bbox sum, bbox count]
+        self._last_bbox = None
+
+    def push(
+        self, idx: int, bbox: Tuple[int, int, int, int] | None
+    ) -> List[Tuple[int, Tuple[int, int, int, int] | None]]:
+        """Add frame idx and return the (idx, bbox) pairs that became final."""
+        center = None
+        if bbox is not None:
+            x1, y1, x2, y2 = bbox
+            center = (int((x1 + x2) / 2), int((y1 + y2) / 2))
+        if self._cpd.update(idx, center) is not None:
+            self._segment = idx
+        stats = self._segment_stats.setdefault(self._segment, [np.zeros(4), 0])
+        if bbox is not None:
+            stats[0] += bbox
+            stats[1] += 1
+        self._pending.append((idx, bbox, self._segment))
+
+        ready = []
+        while self._pending and (
+            self._pending[0][2] != self._segment
+            or idx - self._pending[0][0] >= self.lookahead
+        ):
+            ready.append(self._pop())
+        return ready
+
+    def finish(self) -> List[Tuple[int, Tuple[int, int, int, int] | None]]:
+        """Flush the frames still waiting for lookahead at the end of the video."""
+        return [self._pop() for _ in range(len(self._pending))]
+
+    def _pop(self) -> Tuple[int, Tuple[int, int, int, int] | None]:
+        idx, bbox, segment = self._pending.popleft()
+        if bbox is None:
+            bbox_sum, count = self._segment_stats[segment]
+            if count:
+                bbox = tuple(map(int, bbox_sum / count))
+            elif self._last_bbox is not None:
+                bbox = self._last_bbox
+            elif self._pending:
+                bbox = self._pending[0][1]
+            if bbox is not None:
+                self.filled_frames += 1
+        if not self._pending or self._pending[0][2] != segment:
+            if segment != self._segment:
+                del self._segment_stats[segment]
+        self._last_bbox = bbox
+        return idx, bbox
+
+
+def find_2d_data_bkps(
+    X: List[Tuple[int, int] | None] | np.ndarray,
+    engine: str = IMPUTATION_ENGINE,
+    pen: float = IMPUTATION_PENALTY,
+    valid: np.ndarray | None = None,
+) -> List[int]:
+    """Change points of the bbox center series, without the final len(X).
+
+    X is a list of centers with None for unknown frames, or an [N, 2] array
+    of centers together with the `valid` mask of the known ones.
+
+    engine is "kernel" (ruptures RBF KernelCPD, quadratic in the number of
+    frames), "pelt" (linear time L2 PELT), "jump" (streaming center jump
+    threshold) or "auto", which keeps the kernel engine for videos up to
+    IMPUTATION_KERNEL_MAX_FRAMES frames and switches to pelt beyond.
+    """
+    if engine not in CPD_ENGINES:
+        raise ValueError(f"Unknown CPD engine: {engine}. Available engines: {CPD_ENGINES}")
+    centers, valid = _as_center_array(X, valid)
+    if not valid.any():
+        return []
+    if engine == "auto":
+        engine = "kernel" if len(centers) <= IMPUTATION_KERNEL_MAX_FRAMES else "pelt"
+    if engine == "jump":
+        return _jump_bkps(centers, valid, IMPUTATION_JUMP_THRESHOLD)[:-1]
+
+    if engine == "pelt":
+        # held instead of interpolated, so a gap across a move does not leave
+        # points halfway between two segments. In units of the jump threshold
+        # rather than standardized: the L2 cost is unbounded, and standardizing
+        # a static watermark's center only blows its jitter up into changes.
+        centers = _interpolate_centers(centers, valid, hold=True)
+        bkps = _pelt_l2_bkps(centers / IMPUTATION_JUMP_THRESHOLD, pen)
+    else:
+        centers = _standardize(_interpolate_centers(centers, valid))
+        algo = rpt.KernelCPD(kernel="rbf", jump=1).fit(centers)
+        bkps = algo.predict(pen=pen)
+    return [int(bkp) for bkp in bkps[:-1]]
 
 
 def get_interval_average_bbox(
     bboxes: List[Tuple[int, int, int, int] | None], bkps: List[int]
 ) -> List[Tuple[int, int, int, int]]:
-    average_bboxes = []
-    for left, right in zip(bkps[:-1], bkps[1:]):
-        bboxes_interval = bboxes[left:right]
-        valid_bboxes = [bbox for bbox in bboxes_interval if bbox is not None]
-        if len(valid_bboxes) > 0:
-            average_bbox = np.mean(valid_bboxes, axis=0)
-            average_bboxes.append(tuple(map(int, average_bbox)))
-        else:
-            average_bboxes.append(None)
-    return average_bboxes
+    averages, has_bbox = BBoxTrack.from_list(bboxes).interval_average(bkps)
+    return [
+        tuple(int(v) for v in average) if valid else None
+        for average, valid in zip(averages, has_bbox)
+    ]
 
 
 def find_idxs_interval(idxs: List[int], bkps: List[int]) -> List[int]:
-    def _find_idx_interval(_idx: int) -> int:
-        left = 0
-        right = len(bkps) - 2 
-
-        while left <= right:
-            mid = (left + right) // 2
-            if bkps[mid] <= _idx < bkps[mid + 1]:
-                return mid
-            elif _idx < bkps[mid]:
-                right = mid - 1
-            else:
-                left = mid + 1
-        return min(max(left, 0), len(bkps) - 2)
-
-    intervals = []
-    for idx in idxs:
-        interval_idx = _find_idx_interval(idx)
-        intervals.append(interval_idx)
-    return intervals
+    return find_intervals(np.asarray(idxs, dtype=int), bkps).tolist()
@@ -0,0 +1,31 @@
+import cv2
+import numpy as np
+
+from sorawm.configs import DETECT_JUMP_THRESHOLD, SCENE_CHANGE_THRESHOLD
+
+THUMBNAIL_SIZE = (64, 36)
+
+
+def make_thumbnail(frame: np.ndarray) -> np.ndarray:
+    small = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+def is_scene_change(
+    prev_thumbnail: np.ndarray,
+    thumbnail: np.ndarray,
+    threshold: float = SCENE_CHANGE_THRESHOLD,
+) -> bool:
+    return float(np.mean(cv2.absdiff(prev_thumbnail, thumbnail))) > threshold
+
+
+def bbox_jumped(
+    prev_result: dict, result: dict, threshold: float = DETECT_JUMP_THRESHOLD
+) -> bool:
+    """Whether the detection changed between two keyframes enough to re-check the gap."""
+    if prev_result["detected"] != result["detected"]:
+        return True
+    if not result["detected"]:
+        return False
+    (px, py), (cx, cy) = prev_result["center"], result["center"]
+    return float(np.hypot(cx - px, cy - py)) > threshold
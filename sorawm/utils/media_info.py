@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import lru_cache
+from pathlib import Path
+
+import ffmpeg
+
+from sorawm.configs import MEDIA_INFO_CACHE_SIZE
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """The ffprobe metadata the pipeline needs, probed once per file version."""
+
+    path: Path
+    size: int
+    width: int
+    height: int
+    fps: float
+    total_frames: int
+    duration: float
+    start_time: float
+    video_codec: str
+    bitrate: str | None
+    audio_codec: str | None
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_codec is not None
+
+    @classmethod
+    def from_probe(cls, path: Path, size: int, probe: dict) -> "MediaInfo":
+        streams = probe.get("streams", [])
+        video_info = next(s for s in streams if s["codec_type"] == "video")
+        audio_info = next((s for s in streams if s["codec_type"] == "audio"), None)
+        fps = float(Fraction(video_info["r_frame_rate"]))
+        duration = float(
+            video_info.get("duration") or probe.get("format", {}).get("duration") or 0
+        )
+        if "nb_frames" in video_info:
+            total_frames = int(video_info["nb_frames"])
+        else:
+            # 通过时长计算
+            total_frames = int(duration * fps)
+        return cls(
+            path=path,
+            size=size,
+            width=int(video_info["width"]),
+            height=int(video_info["height"]),
+            fps=fps,
+            total_frames=total_frames,
+            duration=duration,
+            start_time=float(video_info.get("start_time", 0) or 0),
+            video_codec=video_info.get("codec_name", "unknown"),
+            bitrate=video_info.get("bit_rate", None),
+            audio_codec=audio_info.get("codec_name", "unknown") if audio_info else None,
+        )
+
+
+@lru_cache(maxsize=MEDIA_INFO_CACHE_SIZE)
+def _probe_cached(path: str, mtime_ns: int, size: int) -> MediaInfo:
+    # mtime and size are part of the key so a rewritten file is probed again
+    return MediaInfo.from_probe(Path(path), size, ffmpeg.probe(path))
+
+
+def probe_media(path: Path) -> MediaInfo:
+    """MediaInfo of path, memoized by path + mtime + size with LRU eviction."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    return _probe_cached(str(path), stat.st_mtime_ns, stat.st_size)
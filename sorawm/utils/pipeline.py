@@ -0,0 +1,101 @@
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List
+
+from sorawm.configs import PIPELINE_QUEUE_SIZE
+
+_END = object()
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def batched(items: Iterable, batch_size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_pipeline(
+    stages: List[Callable[[Iterator], Iterable | None]],
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    on_error: Callable[[], None] | None = None,
+):
+    """Run each stage in its own thread, connected by bounded queues.
+
+    A stage receives an iterator over the items produced by the previous stage
+    and returns an iterable of items for the next one (the first stage gets an
+    empty iterator, the last one may return None). A full queue blocks the
+    producer, so a slow stage applies backpressure upstream instead of letting
+    frames pile up in memory. The first error raised by any stage stops the
+    whole pipeline and is re-raised here. `on_error` is called once at that
+    point to unblock stages waiting on something other than a queue.
+    """
+    stop = threading.Event()
+    errors = []
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages[:-1]]
+
+    def put(q: queue.Queue, item):
+        while True:
+            if stop.is_set():
+                raise _Cancelled()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def drain(q: queue.Queue):
+        while True:
+            if stop.is_set():
+                raise _Cancelled()
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return
+            yield item
+
+    def worker(stage_idx: int):
+        is_last = stage_idx == len(stages) - 1
+        outputs = None
+        try:
+            inputs = drain(queues[stage_idx - 1]) if stage_idx > 0 else iter(())
+            outputs = stages[stage_idx](inputs)
+            for item in outputs or ():
+                if not is_last:
+                    put(queues[stage_idx], item)
+            if not is_last:
+                put(queues[stage_idx], _END)
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            errors.append(e)
+            if not stop.is_set():
+                stop.set()
+                if on_error is not None:
+                    on_error()
+        finally:
+            if hasattr(outputs, "close"):
+                outputs.close()
+            if is_last:
+                # release producers still blocked on a queue nobody reads
+                stop.set()
+
+    threads = [
+        threading.Thread(target=worker, args=(stage_idx,), daemon=True)
+        for stage_idx in range(len(stages))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
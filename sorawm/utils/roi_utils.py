@@ -0,0 +1,50 @@
+from typing import Tuple
+
+
+def clip_bbox(
+    bbox: Tuple[int, int, int, int], width: int, height: int
+) -> Tuple[int, int, int, int]:
+    x1, y1, x2, y2 = bbox
+    x1 = min(max(int(x1), 0), width)
+    x2 = min(max(int(x2), x1), width)
+    y1 = min(max(int(y1), 0), height)
+    y2 = min(max(int(y2), y1), height)
+    return x1, y1, x2, y2
+
+
+def _expand_span(low: int, high: int, size: int, limit: int) -> Tuple[int, int]:
+    # grow [low, high) to `size`, shifting back inside [0, limit) at the edges
+    size = min(size, limit)
+    extra = size - (high - low)
+    low -= extra // 2
+    high += extra - extra // 2
+    if low < 0:
+        high -= low
+        low = 0
+    if high > limit:
+        low -= high - limit
+        high = limit
+    return max(low, 0), high
+
+
+def get_roi_window(
+    bbox: Tuple[int, int, int, int],
+    width: int,
+    height: int,
+    margin: int,
+    align: int = 8,
+) -> Tuple[int, int, int, int]:
+    """Context window (l, t, r, b) around a bbox for region-only inpainting.
+
+    The window keeps `margin` pixels of context on each side and its size is
+    rounded up to a multiple of `align` so the model does not need to pad it.
+    Windows near the frame edge are shifted inwards instead of shrunk.
+    """
+    x1, y1, x2, y2 = clip_bbox(bbox, width, height)
+    roi_w = x2 - x1 + margin * 2
+    roi_h = y2 - y1 + margin * 2
+    roi_w = -(-roi_w // align) * align
+    roi_h = -(-roi_h // align) * align
+    l, r = _expand_span(x1, x2, roi_w, width)
+    t, b = _expand_span(y1, y2, roi_h, height)
+    return l, t, r, b
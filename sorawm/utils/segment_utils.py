@@ -0,0 +1,121 @@
+import bisect
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Iterable, List, Tuple
+
+import ffmpeg
+
+
+def split_gop_chunks(
+    keyframes: List[int], total_frames: int, num_chunks: int, min_frames: int = 1
+) -> List[Tuple[int, int]]:
+    """Split [0, total_frames) into about num_chunks ranges starting on keyframes.
+
+    Each ideal boundary snaps to the nearest keyframe, boundaries closer than
+    min_frames to each other or to the ends are dropped.
+    """
+    boundaries = [0]
+    for chunk_idx in range(1, num_chunks):
+        target = total_frames * chunk_idx // num_chunks
+        pos = bisect.bisect_left(keyframes, target)
+        candidates = keyframes[max(pos - 1, 0) : pos + 1]
+        if not candidates:
+            continue
+        boundary = min(candidates, key=lambda keyframe: abs(keyframe - target))
+        if (
+            boundary - boundaries[-1] >= min_frames
+            and total_frames - boundary >= min_frames
+        ):
+            boundaries.append(boundary)
+    boundaries.append(total_frames)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def fixed_segments(total_frames: int, segment_frames: int) -> List[Tuple[int, int]]:
+    """Split [0, total_frames) into consecutive ranges of segment_frames frames."""
+    segment_frames = max(1, segment_frames)
+    return [
+        (start, min(start + segment_frames, total_frames))
+        for start in range(0, max(total_frames, 1), segment_frames)
+    ]
+
+
+class SegmentCheckpoint:
+    """Fixed-length output segments of one job and which of them are encoded.
+
+    Segments are written to segment_dir/segment_{idx:05d}.mp4. `on_commit` is
+    called with the checkpoint once a segment is complete, so the caller can
+    persist `segment_frames` and `completed` and pass them back on a retry to
+    resume from there. segment_frames is chosen by SoraWM.run when None.
+    """
+
+    def __init__(
+        self,
+        segment_dir: Path,
+        segment_frames: int | None = None,
+        completed: Iterable[int] = (),
+        on_commit: Callable[["SegmentCheckpoint"], None] | None = None,
+    ):
+        self.segment_dir = Path(segment_dir)
+        self.segment_frames = segment_frames
+        self.completed = set(completed)
+        self.on_commit = on_commit
+
+    def segment_path(self, segment_idx: int) -> Path:
+        return self.segment_dir / f"segment_{segment_idx:05d}.mp4"
+
+    def is_done(self, segment_idx: int) -> bool:
+        # a recorded segment whose file went missing is encoded again
+        path = self.segment_path(segment_idx)
+        return (
+            segment_idx in self.completed and path.exists() and path.stat().st_size > 0
+        )
+
+    def commit(self, segment_idx: int):
+        self.completed.add(segment_idx)
+        if self.on_commit is not None:
+            self.on_commit(self)
+
+    def to_dict(self) -> dict:
+        return {"segment_frames": self.segment_frames, "completed": sorted(self.completed)}
+
+    def cleanup(self):
+        shutil.rmtree(self.segment_dir, ignore_errors=True)
+
+
+def concat_segments(
+    segment_paths: List[Path],
+    output_path: Path,
+    audio_source: Path | None = None,
+    audio_kwargs: dict | None = None,
+):
+    """Join encoded segments with the ffmpeg concat demuxer, without re-encoding.
+
+    With `audio_source`, its audio streams are muxed in the same pass, encoded
+    per `audio_kwargs` (stream copy by default).
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".txt", dir=output_path.parent, delete=False
+    ) as f:
+        for segment_path in segment_paths:
+            escaped = str(Path(segment_path).resolve()).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_path = Path(f.name)
+    try:
+        streams = [ffmpeg.input(str(list_path), format="concat", safe=0).video]
+        output_kwargs = {"vcodec": "copy"}
+        if audio_source is not None:
+            streams.append(ffmpeg.input(str(audio_source)).audio)
+            output_kwargs.update(audio_kwargs or {"acodec": "copy"})
+        (
+            ffmpeg.output(*streams, str(output_path), **output_kwargs)
+            .overwrite_output()
+            .global_args("-loglevel", "warning")
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        stderr = e.stderr.decode("utf-8", errors="ignore") if e.stderr else ""
+        raise RuntimeError(f"FFmpeg concat failed: {stderr}") from e
+    finally:
+        list_path.unlink(missing_ok=True)
@@ -0,0 +1,99 @@
+from typing import Callable, List
+
+import cv2
+import numpy as np
+
+from sorawm.configs import TEMPORAL_REUSE_MAX_FRAMES, TEMPORAL_REUSE_THRESHOLD
+
+
+def masked_mean_abs_diff(a: np.ndarray, b: np.ndarray, mask: np.ndarray) -> float:
+    """Mean absolute difference (0-255) of two crops, outside the watermark mask."""
+    context = cv2.bitwise_not(mask)
+    if cv2.countNonZero(context) == 0:
+        return float(np.mean(cv2.absdiff(a, b)))
+    diff = cv2.mean(cv2.absdiff(a, b), mask=context)
+    return float(np.mean(diff[: a.shape[2] if a.ndim == 3 else 1]))
+
+
+class TemporalPatchReuse:
+    """Skip the inpaint model for crops whose surroundings did not change.
+
+    The last crop sent to the model is kept as the reference. A following crop
+    with the same window and mask whose context differs from the reference by
+    at most `threshold` reuses the reference fill for the masked area and keeps
+    its own context pixels. Comparing against the reference instead of the
+    previous frame keeps slow drifts from accumulating, and `max_reuse` bounds
+    how long a single fill can be reused.
+    """
+
+    def __init__(
+        self,
+        threshold: float = TEMPORAL_REUSE_THRESHOLD,
+        max_reuse: int = TEMPORAL_REUSE_MAX_FRAMES,
+    ):
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self.model_frames = 0
+        self.reused_frames = 0
+        self._ref_window = None
+        self._ref_crop = None
+        self._ref_mask = None
+        self._ref_cleaned = None
+        self._reuse_count = 0
+
+    def _matches(self, window, crop, mask) -> bool:
+        return (
+            self._ref_crop is not None
+            and window == self._ref_window
+            and self._reuse_count < self.max_reuse
+            and crop.shape == self._ref_crop.shape
+            and np.array_equal(mask, self._ref_mask)
+            and masked_mean_abs_diff(crop, self._ref_crop, mask) <= self.threshold
+        )
+
+    def clean(
+        self,
+        windows: List[tuple],
+        crops: List[np.ndarray],
+        masks: List[np.ndarray],
+        clean_fn: Callable[[List[np.ndarray], List[np.ndarray]], List[np.ndarray]],
+    ) -> List[np.ndarray]:
+        """Clean crops in frame order, calling clean_fn only for new references."""
+        sources = []
+        model_idxs = []
+        for i, (window, crop, mask) in enumerate(zip(windows, crops, masks)):
+            if self._matches(window, crop, mask):
+                self._reuse_count += 1
+                sources.append(self._ref_cleaned)
+                continue
+            model_idxs.append(i)
+            self._ref_window = window
+            self._ref_crop = crop.copy()
+            self._ref_mask = mask
+            self._ref_cleaned = len(model_idxs) - 1
+            self._reuse_count = 0
+            sources.append(None)
+
+        model_results = clean_fn(
+            [crops[i] for i in model_idxs], [masks[i] for i in model_idxs]
+        )
+        if isinstance(self._ref_cleaned, int):
+            self._ref_cleaned = model_results[self._ref_cleaned]
+
+        results = []
+        model_pos = 0
+        for i, source in enumerate(sources):
+            if source is None:
+                results.append(model_results[model_pos])
+                model_pos += 1
+                continue
+            if isinstance(source, int):
+                source = model_results[source]
+            result = crops[i].copy()
+            fill = masks[i] > 0
+            result[fill] = source[fill]
+            results.append(result)
+
+        self.model_frames += len(model_idxs)
+        self.reused_frames += len(crops) - len(model_idxs)
+        return results
@@ -1,46 +1,153 @@
+import math
+import queue
 from pathlib import Path
+from typing import List
 
 import ffmpeg
 import numpy as np
 
+from sorawm.utils.media_info import MediaInfo, probe_media
+
+
+class FrameBufferPool:
+    """A fixed set of reusable frame arrays for VideoLoader.iter_range(pool=...).
+
+    A frame handed out by the pool belongs to the consumer until it is passed
+    back to release(). acquire() blocks while every buffer is in use, so the
+    pool size also bounds how many decoded frames can be alive at once.
+    """
+
+    def __init__(self, width: int, height: int, size: int):
+        self.size = size
+        self.closed = False
+        self._owned = set()
+        self._free = queue.Queue()
+        for _ in range(size):
+            buffer = np.empty((height, width, 3), dtype=np.uint8)
+            self._owned.add(id(buffer))
+            self._free.put(buffer)
+
+    def acquire(self) -> np.ndarray:
+        while True:
+            if self.closed:
+                raise RuntimeError("Frame buffer pool is closed")
+            try:
+                return self._free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def close(self):
+        """Wake up and fail a producer blocked in acquire(), e.g. after a consumer error."""
+        self.closed = True
+
+    def release(self, frame: np.ndarray):
+        if id(frame) not in self._owned:
+            raise ValueError("frame does not belong to this pool")
+        self._free.put(frame)
+
+
+def _read_into(stream, buffer: np.ndarray) -> bool:
+    view = memoryview(buffer).cast("B")
+    total = 0
+    while total < len(view):
+        read = stream.readinto(view[total:])
+        if not read:
+            break
+        total += read
+    # a trailing partial frame is dropped like the end of the stream
+    return total == len(view)
+
 
 class VideoLoader:
-    def __init__(self, video_path: Path):
+    def __init__(self, video_path: Path, media_info: MediaInfo | None = None):
         self.video_path = video_path
+        self.media_info = media_info
+        self._keyframe_indices = None
         self.get_video_info()
 
     def get_video_info(self):
-        probe = ffmpeg.probe(self.video_path)
-        video_info = next(s for s in probe["streams"] if s["codec_type"] == "video")
-        width = int(video_info["width"])
-        height = int(video_info["height"])
-        fps = eval(video_info["r_frame_rate"])
-        self.width = width
-        self.height = height
-        self.fps = fps
-        if "nb_frames" in video_info:
-            self.total_frames = int(video_info["nb_frames"])
-        else:
-            # 通过时长计算
-            duration = float(video_info.get("duration", probe["format"]["duration"]))
-            self.total_frames = int(duration * self.fps)
-
-        original_bitrate = video_info.get("bit_rate", None)
-        self.original_bitrate = original_bitrate
+        if self.media_info is None:
+            self.media_info = probe_media(self.video_path)
+        self.width = self.media_info.width
+        self.height = self.media_info.height
+        self.fps = self.media_info.fps
+        self.total_frames = self.media_info.total_frames
+        self.original_bitrate = self.media_info.bitrate
+        self.start_time = self.media_info.start_time
+        self.audio_codec = self.media_info.audio_codec
+
+    @property
+    def has_audio(self) -> bool:
+        return self.media_info.has_audio
 
     def __len__(self):
         return self.total_frames
 
     def __iter__(self):
+        return self.iter_range(0)
+
+    def keyframe_indices(self) -> List[int]:
+        """Frame indices of the video keyframes, probed once and cached."""
+        if self._keyframe_indices is None:
+            probe = ffmpeg.probe(
+                self.video_path,
+                select_streams="v:0",
+                skip_frame="nokey",
+                show_entries="frame=pts_time,best_effort_timestamp_time",
+            )
+            indices = set()
+            for frame in probe.get("frames", []):
+                pts_time = frame.get("pts_time", frame.get("best_effort_timestamp_time"))
+                if pts_time in (None, "N/A"):
+                    continue
+                indices.add(round((float(pts_time) - self.start_time) * self.fps))
+            self._keyframe_indices = sorted(idx for idx in indices if idx >= 0) or [0]
+        return self._keyframe_indices
+
+    def get_frame(self, idx: int) -> np.ndarray:
+        for frame in self.iter_range(idx, idx + 1):
+            return frame
+        raise IndexError(f"frame {idx} out of range")
+
+    def iter_range(
+        self, start: int, end: int | None = None, pool: FrameBufferPool | None = None
+    ):
+        """Yield frames [start, end) without decoding from the beginning.
+
+        ffmpeg seeks the input to the keyframe before `start` and drops the
+        frames up to it, so the cost is one GOP instead of the whole prefix.
+        Frame indices map to timestamps through the constant frame rate.
+        With a pool, frames are read with readinto into buffers from `pool`
+        instead of a new bytes object per frame, and the consumer must
+        pool.release() every yielded frame once done with it.
+        """
+        input_kwargs = {}
+        if start > 0:
+            # round down to microseconds so the seek never lands after frame `start`
+            input_kwargs["ss"] = f"{math.floor(start / self.fps * 1e6) / 1e6:.6f}"
+        output_kwargs = {}
+        if end is not None:
+            if end <= start:
+                return
+            output_kwargs["vframes"] = end - start
+
         process_in = (
-            ffmpeg.input(self.video_path)
-            .output("pipe:", format="rawvideo", pix_fmt="bgr24")
+            ffmpeg.input(self.video_path, **input_kwargs)
+            .output("pipe:", format="rawvideo", pix_fmt="bgr24", **output_kwargs)
             .global_args("-loglevel", "error")
             .run_async(pipe_stdout=True)
         )
 
         try:
             while True:
+                if pool is not None:
+                    frame = pool.acquire()
+                    if not _read_into(process_in.stdout, frame):
+                        pool.release(frame)
+                        break
+                    yield frame
+                    continue
+
                 in_bytes = process_in.stdout.read(self.width * self.height * 3)
                 if not in_bytes:
                     break
@@ -56,7 +163,6 @@ class VideoLoader:
                 process_in.stderr.close()
             process_in.wait()
 
-
 if __name__ == "__main__":
     from tqdm import tqdm
 
@@ -1,24 +1,26 @@
 from pathlib import Path
+from typing import List, Tuple
 
 import cv2
 import numpy as np
 import torch
 from loguru import logger
 
-from sorawm.configs import DEFAULT_WATERMARK_REMOVE_MODEL
+from sorawm.configs import DEFAULT_WATERMARK_REMOVE_MODEL, ROI_CONTEXT_MARGIN
 from sorawm.iopaint.const import DEFAULT_MODEL_DIR
 from sorawm.iopaint.download import cli_download_model, scan_models
 from sorawm.iopaint.model_manager import ModelManager
 from sorawm.iopaint.schema import InpaintRequest
 from sorawm.utils.devices_utils import get_device
+from sorawm.utils.roi_utils import clip_bbox, get_roi_window
 
 # This codebase is from https://github.com/Sanster/IOPaint#, thanks for their amazing work!
 
 
 class WaterMarkCleaner:
-    def __init__(self):
+    def __init__(self, device: str | None = None):
         self.model = DEFAULT_WATERMARK_REMOVE_MODEL
-        self.device = get_device()
+        self.device = torch.device(device) if device else get_device()
 
         scanned_models = scan_models()
         if self.model not in [it.name for it in scanned_models]:
@@ -36,3 +38,64 @@ class WaterMarkCleaner:
         inpaint_result = cv2.cvtColor(inpaint_result, cv2.COLOR_BGR2RGB)
         return inpaint_result
 
+    def clean_batch(
+        self, input_images: List[np.array], watermark_masks: List[np.array]
+    ) -> List[np.array]:
+        inpaint_results = self.model_manager.batch_call(
+            input_images, watermark_masks, self.inpaint_request
+        )
+        return [
+            cv2.cvtColor(inpaint_result, cv2.COLOR_BGR2RGB)
+            for inpaint_result in inpaint_results
+        ]
+
+    def crop_regions(
+        self,
+        input_images: List[np.array],
+        bboxes: List[tuple],
+        margin: int = ROI_CONTEXT_MARGIN,
+    ) -> Tuple[List[tuple], List[np.array], List[np.array]]:
+        """Cut the context window around each bbox and build its crop-sized mask."""
+        windows = []
+        crops = []
+        crop_masks = []
+        for input_image, bbox in zip(input_images, bboxes):
+            height, width = input_image.shape[:2]
+            x1, y1, x2, y2 = clip_bbox(bbox, width, height)
+            l, t, r, b = get_roi_window((x1, y1, x2, y2), width, height, margin)
+            crop_mask = np.zeros((b - t, r - l), dtype=np.uint8)
+            crop_mask[y1 - t : y2 - t, x1 - l : x2 - l] = 255
+            windows.append((l, t, r, b))
+            crops.append(input_image[t:b, l:r])
+            crop_masks.append(crop_mask)
+        return windows, crops, crop_masks
+
+    def clean_crops(
+        self, crops: List[np.array], crop_masks: List[np.array]
+    ) -> List[np.array]:
+        groups = {}
+        for i, crop in enumerate(crops):
+            groups.setdefault(crop.shape, []).append(i)
+        cleaned_crops = [None] * len(crops)
+        for positions in groups.values():
+            results = self.clean_batch(
+                [crops[i] for i in positions], [crop_masks[i] for i in positions]
+            )
+            for i, result in zip(positions, results):
+                cleaned_crops[i] = result
+        return cleaned_crops
+
+    def paste_regions(
+        self,
+        input_images: List[np.array],
+        windows: List[tuple],
+        cleaned_crops: List[np.array],
+    ) -> List[np.array]:
+        cleaned_images = []
+        for input_image, (l, t, r, b), cleaned_crop in zip(
+            input_images, windows, cleaned_crops
+        ):
+            result = input_image.copy()
+            result[t:b, l:r] = cleaned_crop
+            cleaned_images.append(result)
+        return cleaned_images
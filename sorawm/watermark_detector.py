@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import List
 
 import numpy as np
 from loguru import logger
@@ -13,11 +14,11 @@ from sorawm.utils.video_utils import VideoLoader
 
 
 class SoraWaterMarkDetector:
-    def __init__(self):
+    def __init__(self, device: str | None = None):
         download_detector_weights()
         logger.debug(f"Begin to load yolo water mark detet model.")
         self.model = YOLO(WATER_MARK_DETECT_YOLO_WEIGHTS)
-        self.model.to(str(get_device()))
+        self.model.to(device or str(get_device()))
         logger.debug(f"Yolo water mark detet model loaded.")
 
         self.model.eval()
@@ -26,8 +27,16 @@ class SoraWaterMarkDetector:
         # Run YOLO inference
         results = self.model(input_image, verbose=False)
         # Extract predictions from the first (and only) result
-        result = results[0]
+        return self._parse_result(results[0])
 
+    def detect_batch(self, input_images: List[np.array]) -> List[dict]:
+        """Run YOLO on several frames at once, one result dict per frame."""
+        if len(input_images) == 0:
+            return []
+        results = self.model(list(input_images), verbose=False)
+        return [self._parse_result(result) for result in results]
+
+    def _parse_result(self, result):
         # Check if any detections were made
         if len(result.boxes) == 0:
             return {"detected": False, "bbox": None, "confidence": None, "center": None}
@@ -52,7 +61,6 @@ class SoraWaterMarkDetector:
             "center": (int(center_x), int(center_y)),
         }
 
-
 if __name__ == "__main__":
     from pathlib import Path
 
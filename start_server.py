@@ -6,6 +6,7 @@ from loguru import logger
 
 from sorawm.configs import LOGS_PATH
 from sorawm.server.app import init_app
+from sorawm.server.db import migrate_db
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--host", default="0.0.0.0", help="host")
@@ -17,11 +18,24 @@ logger.add(LOGS_PATH / "log_file.log", rotation="1 week")
 
 def start_server(port=args.port, host=args.host):
     logger.info(f"Starting server at {host}:{port}")
-    app = init_app()
-    config = uvicorn.Config(app, host=host, port=port, workers=args.workers)
-    server = uvicorn.Server(config=config)
     try:
-        server.run()
+        if args.workers > 1:
+            # the workers' own init_db then finds the schema up to date
+            migrate_db()
+            # uvicorn needs an import string to spawn workers, each process
+            # loads its own models and they share the task queue in the database
+            uvicorn.run(
+                "sorawm.server.app:init_app",
+                factory=True,
+                host=host,
+                port=port,
+                workers=args.workers,
+            )
+        else:
+            app = init_app()
+            config = uvicorn.Config(app, host=host, port=port)
+            server = uvicorn.Server(config=config)
+            server.run()
     finally:
         logger.info("Server shutdown.")
 
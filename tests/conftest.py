@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from sorawm.server import db
+
+
+@pytest.fixture
+def run_db(tmp_path, monkeypatch):
+    """Run a coroutine against a fresh SQLite database in tmp_path."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}")
+    monkeypatch.setattr(db, "engine", engine)
+    monkeypatch.setattr(
+        db,
+        "async_session_maker",
+        async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False),
+    )
+
+    def run(coro_fn):
+        async def main():
+            try:
+                await db.init_db()
+                return await coro_fn()
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
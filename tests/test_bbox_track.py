@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from sorawm.utils.bbox_track import BBoxTrack, find_intervals
+
+
+def _dict_fill(bboxes, missed, bkps):
+    """The per-frame dict fill BBoxTrack.fill replaced, kept as the reference."""
+    n = len(bboxes)
+    frame_bboxes = {idx: {"bbox": bbox} for idx, bbox in enumerate(bboxes)}
+    averages = []
+    for left, right in zip(bkps[:-1], bkps[1:]):
+        valid = [bbox for bbox in bboxes[left:right] if bbox is not None]
+        averages.append(tuple(map(int, np.mean(valid, axis=0))) if valid else None)
+    for idx in missed:
+        interval = min(max(np.searchsorted(bkps, idx, side="right") - 1, 0), len(bkps) - 2)
+        if interval < len(averages) and averages[interval] is not None:
+            frame_bboxes[idx]["bbox"] = averages[interval]
+        else:
+            before = frame_bboxes[max(idx - 1, 0)]["bbox"]
+            after = frame_bboxes[min(idx + 1, n - 1)]["bbox"]
+            if before:
+                frame_bboxes[idx]["bbox"] = before
+            elif after:
+                frame_bboxes[idx]["bbox"] = after
+    return [frame_bboxes[idx]["bbox"] for idx in range(n)]
+
+
+def _random_bboxes(rng, n, miss_rate):
+    bboxes = []
+    for _ in range(n):
+        if rng.random() < miss_rate:
+            bboxes.append(None)
+        else:
+            x, y = rng.integers(0, 500, size=2)
+            w, h = rng.integers(10, 80, size=2)
+            bboxes.append((int(x), int(y), int(x + w), int(y + h)))
+    return bboxes
+
+
+def test_interval_average_matches_mean():
+    bboxes = [(0, 0, 10, 10), None, (3, 4, 14, 15), None, None, (100, 50, 130, 71)]
+    averages, has_bbox = BBoxTrack.from_list(bboxes).interval_average([0, 3, 5, 6])
+    assert has_bbox.tolist() == [True, False, True]
+    assert tuple(averages[0]) == (1, 2, 12, 12)
+    assert tuple(averages[2]) == (100, 50, 130, 71)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fill_matches_dict_fill(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 120))
+    # long missing runs make intervals without any bbox, exercising the fallback
+    bboxes = _random_bboxes(rng, n, miss_rate=rng.choice([0.1, 0.5, 0.9]))
+    inner = rng.choice(np.arange(1, n), size=int(rng.integers(0, min(n - 1, 8))), replace=False)
+    bkps = [0, *sorted(int(b) for b in inner), n]
+    missed = [idx for idx, bbox in enumerate(bboxes) if bbox is None]
+
+    track = BBoxTrack.from_list(bboxes)
+    track.fill(np.array(missed, dtype=int), bkps)
+
+    assert [track.get(idx) for idx in range(n)] == _dict_fill(bboxes, missed, bkps)
+
+
+def test_track_grows_past_capacity():
+    track = BBoxTrack(2)
+    track.set(5, (1, 2, 3, 4), 0.5)
+    track.set_skipped(7)
+    assert len(track) == 8
+    assert track.get(5) == (1, 2, 3, 4)
+    assert track.get(6) is None
+    assert track.skipped.tolist() == [False] * 7 + [True]
+
+
+def test_find_intervals_clips_to_range():
+    intervals = find_intervals(np.array([0, 4, 5, 9, 12]), [0, 5, 10])
+    assert intervals.tolist() == [0, 0, 1, 1, 1]
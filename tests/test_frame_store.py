@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from sorawm.utils.frame_store import FrameStore, FrameStoreFull
+
+WIDTH, HEIGHT = 16, 8
+
+
+def _frame(idx: int) -> np.ndarray:
+    return np.full((HEIGHT, WIDTH, 3), idx % 256, dtype=np.uint8)
+
+
+def _store(tmp_path, ram_frames: int, **kwargs) -> FrameStore:
+    return FrameStore(
+        WIDTH, HEIGHT, max_ram_mb=0, scratch_dir=tmp_path, min_ram_frames=ram_frames, **kwargs
+    )
+
+
+def test_frames_come_back_across_the_spill_boundary(tmp_path):
+    with _store(tmp_path, ram_frames=4, max_disk_mb=None) as store:
+        for idx in range(10):
+            assert store.append(_frame(idx)) == idx
+        assert len(store) == 10
+        # 0-5 were evicted to the memmap, 6-9 are still in the ring
+        assert store._spill_count == 6
+        for idx in range(10):
+            assert np.array_equal(store[idx], _frame(idx))
+        assert np.array_equal(store.get(-1, copy=True), _frame(9))
+        assert [int(frame[0, 0, 0]) for frame in store] == list(range(10))
+        with pytest.raises(IndexError):
+            store[10]
+    # the scratch file goes with the store
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spilled_frames_survive_later_appends(tmp_path):
+    with _store(tmp_path, ram_frames=2, max_disk_mb=None) as store:
+        for idx in range(3):
+            store.append(_frame(idx))
+        assert np.array_equal(store[0], _frame(0))
+        # the memmap view is reopened once the spill file has grown
+        for idx in range(3, 8):
+            store.append(_frame(idx))
+        assert np.array_equal(store[0], _frame(0))
+        assert np.array_equal(store[5], _frame(5))
+
+
+def test_released_frames_are_not_spilled(tmp_path):
+    with _store(tmp_path, ram_frames=3, max_disk_mb=None) as store:
+        for idx in range(20):
+            store.append(_frame(idx))
+            # consumed as fast as decoded, the ring slots are reused in place
+            store.release(idx - 1)
+        assert store._spill_count == 0
+        assert store._spill_path is None
+        with pytest.raises(IndexError):
+            store[0]
+        assert np.array_equal(store[19], _frame(19))
+
+
+def test_disk_budget_raises(tmp_path):
+    with _store(tmp_path, ram_frames=2, max_disk_mb=1) as store:
+        disk_frames = (1024 * 1024) // (WIDTH * HEIGHT * 3)
+        assert store.capacity == 2 + disk_frames
+        for idx in range(2 + disk_frames):
+            store.append(_frame(idx))
+        with pytest.raises(FrameStoreFull):
+            store.append(_frame(0))
+        assert len(store) == 2 + disk_frames
+        assert np.array_equal(store[300], _frame(300))
+
+
+def test_ram_budget_and_min_ram_frames():
+    assert FrameStore.ram_capacity(1920, 1080, 1024) == 172
+    assert FrameStore.ram_capacity(1920, 1080, 0) == 1
+    store = FrameStore(1920, 1080, max_ram_mb=1024)
+    assert store.ram_frames == 172
+    assert store.capacity > 172
+    # the online path grows the ring to cover the imputation lookahead
+    store = FrameStore(1920, 1080, max_ram_mb=1024, max_disk_mb=None, min_ram_frames=300)
+    assert store.ram_frames == 300
+    assert store.capacity == float("inf")
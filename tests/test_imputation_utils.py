@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+import ruptures as rpt
+
+from sorawm.utils.imputation_utils import (
+    OnlineBBoxImputer,
+    StreamingJumpCPD,
+    _jump_bkps,
+    _pelt_l2_bkps,
+)
+
+
+def _steps(rng, lengths, levels, noise=0.05):
+    """Piecewise constant 2D series with gaussian jitter."""
+    X = np.concatenate([np.tile(level, (length, 1)) for length, level in zip(lengths, levels)])
+    return X + rng.normal(0, noise, X.shape)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pelt_matches_ruptures(seed):
+    rng = np.random.default_rng(seed)
+    n_segments = int(rng.integers(1, 6))
+    lengths = rng.integers(5, 80, size=n_segments)
+    X = _steps(rng, lengths, rng.uniform(-3, 3, size=(n_segments, 2)), noise=0.3)
+    pen = float(rng.choice([1.0, 5.0, 20.0]))
+
+    expected = rpt.Pelt(model="l2", min_size=2, jump=1).fit(X).predict(pen=pen)
+    assert _pelt_l2_bkps(X, pen) == expected
+
+
+def test_pelt_long_series_finds_exact_changes():
+    # past _PELT_MAX_POINTS the search runs on block means, then refines
+    rng = np.random.default_rng(0)
+    lengths = [1237, 801, 2950, 13]
+    levels = np.array([[0, 0], [4, 1], [-2, 3], [5, 5]])
+    X = _steps(rng, lengths, levels)
+    assert _pelt_l2_bkps(X, pen=10.0) == np.cumsum(lengths).tolist()
+
+
+def test_pelt_flat_series_has_no_change():
+    X = _steps(np.random.default_rng(1), [3000], [[1, 1]])
+    assert _pelt_l2_bkps(X, pen=10.0) == [3000]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_jump_bkps_matches_streaming(seed):
+    rng = np.random.default_rng(seed)
+    n = 300
+    centers = np.cumsum(rng.integers(-4, 5, size=(n, 2)), axis=0).astype(float)
+    # sudden moves, some of them one frame apart
+    for idx in rng.choice(np.arange(1, n), size=12, replace=False):
+        centers[idx:] += rng.choice([-60, 60], size=2)
+    valid = rng.random(n) > 0.3
+
+    cpd = StreamingJumpCPD(threshold=30)
+    for idx in range(n):
+        cpd.update(idx, tuple(centers[idx]) if valid[idx] else None)
+
+    assert _jump_bkps(centers, valid, threshold=30) == cpd.bkps + [n]
+
+
+def _run_imputer(bboxes, lookahead):
+    imputer = OnlineBBoxImputer(lookahead=lookahead, threshold=30)
+    out = []
+    for idx, bbox in enumerate(bboxes):
+        ready = imputer.push(idx, bbox)
+        # a frame leaves at most `lookahead` frames after it was pushed
+        assert all(idx - ready_idx <= lookahead for ready_idx, _ in ready)
+        out.extend(ready)
+        if out:
+            assert idx - out[-1][0] <= lookahead
+    out.extend(imputer.finish())
+    return out
+
+
+@pytest.mark.parametrize("lookahead", [1, 3, 10, 100])
+def test_online_imputer_order_and_lag(lookahead):
+    rng = np.random.default_rng(lookahead)
+    bboxes = [
+        None if rng.random() < 0.4 else (10, 10, 40, 30) if idx < 50 else (200, 100, 230, 120)
+        for idx in range(120)
+    ]
+    out = _run_imputer(bboxes, lookahead)
+
+    assert [idx for idx, _ in out] == list(range(len(bboxes)))
+    for (idx, filled), bbox in zip(out, bboxes):
+        if bbox is not None:
+            assert filled == bbox
+        else:
+            assert filled is not None
+
+
+def test_online_imputer_fills_with_segment_average():
+    bboxes = [(10, 10, 40, 30), None, (12, 10, 42, 30), None, (200, 100, 230, 120), None]
+    out = dict(_run_imputer(bboxes, lookahead=10))
+    # the first segment is closed by the jump at frame 4
+    assert out[1] == out[3] == (11, 10, 41, 30)
+    assert out[5] == (200, 100, 230, 120)
+
+
+def test_online_imputer_leading_gap_takes_first_bbox():
+    # frame 0 leaves once frame 2 is pushed, by then its segment has a bbox
+    out = _run_imputer([None, None, (5, 5, 15, 15)], lookahead=2)
+    assert [bbox for _, bbox in out] == [(5, 5, 15, 15)] * 3
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from sorawm.server import db
+from sorawm.server.models import Task, get_task
+from sorawm.server.output_cache import evict_outputs
+from sorawm.server.schemas import Status
+
+
+def _finished_task(tmp_path, name: str, age_minutes: int, size: int = 100) -> Task:
+    upload = tmp_path / f"{name}_upload.mp4"
+    output = tmp_path / f"{name}_output.mp4"
+    upload.write_bytes(b"u" * size)
+    output.write_bytes(b"o" * size)
+    return Task(
+        id=name,
+        video_path=str(upload),
+        output_path=str(output),
+        download_url=f"/download/{name}",
+        status=Status.FINISHED,
+        percentage=100,
+        accessed_at=datetime.now() - timedelta(minutes=age_minutes),
+    )
+
+
+def test_evicts_least_recently_used_outputs_with_their_uploads(tmp_path, run_db):
+    tasks = [
+        _finished_task(tmp_path, "new", 1),
+        _finished_task(tmp_path, "mid", 10),
+        _finished_task(tmp_path, "old", 100),
+    ]
+    paths = {task.id: (task.video_path, task.output_path) for task in tasks}
+
+    async def main():
+        async with db.get_session() as session:
+            session.add_all(tasks)
+        # room for the output and upload of two tasks
+        evicted = await evict_outputs(max_bytes=400)
+        async with db.get_session() as session:
+            return evicted, {task.id: await get_task(session, task.id) for task in tasks}
+
+    evicted, stored = run_db(main)
+    assert evicted == [("old", paths["old"][1])]
+    for task_id, (upload, output) in paths.items():
+        kept = task_id != "old"
+        assert (tmp_path / upload).exists() == kept
+        assert (tmp_path / output).exists() == kept
+    assert stored["old"].output_path is None and stored["old"].download_url is None
+    assert stored["old"].status == Status.FINISHED
+    assert stored["new"].output_path == paths["new"][1]
+
+
+def test_unbounded_cache_evicts_nothing(tmp_path, run_db):
+    task = _finished_task(tmp_path, "only", 1)
+
+    async def main():
+        async with db.get_session() as session:
+            session.add(task)
+        return await evict_outputs(max_bytes=0)
+
+    assert run_db(main) == []
+    assert len(list(tmp_path.glob("only_*"))) == 2
@@ -0,0 +1,107 @@
+import itertools
+import threading
+
+import pytest
+
+from sorawm.utils.pipeline import batched, run_pipeline
+
+
+def _run(stages, timeout=10, **kwargs):
+    """run_pipeline in a thread, failing the test instead of hanging on it."""
+    result = {}
+
+    def target():
+        try:
+            run_pipeline(stages, **kwargs)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "run_pipeline did not return"
+    return result.get("error")
+
+
+def test_items_keep_their_order():
+    out = []
+
+    def source(_):
+        yield from range(500)
+
+    def double(items):
+        for item in items:
+            yield item * 2
+
+    def sink(items):
+        out.extend(items)
+
+    assert _run([source, double, sink], queue_size=1) is None
+    assert out == [item * 2 for item in range(500)]
+
+
+def test_stage_error_reaches_the_caller():
+    def source(_):
+        yield from range(100)
+
+    def fail(items):
+        for item in items:
+            if item == 5:
+                raise ValueError("bad frame 5")
+            yield item
+
+    def sink(items):
+        for _ in items:
+            pass
+
+    error = _run([source, fail, sink], queue_size=2)
+    assert isinstance(error, ValueError) and str(error) == "bad frame 5"
+
+
+def test_error_unblocks_producers_on_full_queues():
+    closed = threading.Event()
+
+    def endless(_):
+        try:
+            # blocks on the full queue once the sink stops reading
+            yield from itertools.count()
+        finally:
+            closed.set()
+
+    def sink(items):
+        next(iter(items))
+        raise RuntimeError("encoder died")
+
+    error = _run([endless, sink], queue_size=1)
+    assert isinstance(error, RuntimeError)
+    assert closed.is_set()
+
+
+def test_on_error_unblocks_stages_waiting_elsewhere():
+    # like a decoder waiting for a free FrameBufferPool buffer
+    buffer_free = threading.Event()
+    calls = []
+
+    def on_error():
+        calls.append(1)
+        buffer_free.set()
+
+    def decode(_):
+        yield 0
+        buffer_free.wait()
+        yield 1
+
+    def detect(items):
+        for _ in items:
+            raise RuntimeError("CUDA out of memory")
+
+    error = _run([decode, detect], on_error=on_error)
+    assert isinstance(error, RuntimeError)
+    assert calls == [1]
+
+
+@pytest.mark.parametrize("size", [1, 3, 10])
+def test_batched(size):
+    batches = list(batched(range(10), size))
+    assert [item for batch in batches for item in batch] == list(range(10))
+    assert all(len(batch) == size for batch in batches[:-1])
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import update
+
+from sorawm.server import db, worker as worker_module
+from sorawm.server.models import Task, get_task
+from sorawm.server.schemas import Status
+from sorawm.server.worker import LeaseLost, WMRemoveTaskWorker
+
+
+async def _queued_task(worker: WMRemoveTaskWorker) -> str:
+    task_id = await worker.create_task()
+    await worker.queue_task(task_id, Path("/tmp/video.mp4"))
+    return task_id
+
+
+async def _load(task_id: str) -> Task:
+    async with db.get_session() as session:
+        return await get_task(session, task_id)
+
+
+async def _expire_lease(task_id: str):
+    async with db.get_session() as session:
+        await session.execute(
+            update(Task)
+            .where(Task.id == task_id)
+            .values(lease_expires_at=datetime.now() - timedelta(seconds=1))
+        )
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_only_one_worker_claims_a_task(run_db):
+    a, b = WMRemoveTaskWorker(), WMRemoveTaskWorker()
+
+    async def main():
+        task_id = await _queued_task(a)
+        claims = await asyncio.gather(a._claim_task(), b._claim_task(), a._claim_task())
+        return task_id, claims, await _load(task_id)
+
+    task_id, claims, task = run_db(main)
+    assert [claim[0] for claim in claims if claim is not None] == [task_id]
+    assert task.lease_owner in (a.worker_id, b.worker_id)
+
+
+def test_expired_lease_is_claimed_again(run_db):
+    a, b = WMRemoveTaskWorker(), WMRemoveTaskWorker()
+
+    async def main():
+        task_id = await _queued_task(a)
+        await a._claim_task()
+        live = await b._claim_task()
+        await _expire_lease(task_id)
+        expired = await b._claim_task()
+        return task_id, live, expired, await _load(task_id)
+
+    task_id, live, expired, task = run_db(main)
+    assert live is None
+    assert expired[0] == task_id
+    assert task.lease_owner == b.worker_id
+
+
+def test_requeue_orphaned_tasks(run_db):
+    a, b = WMRemoveTaskWorker(), WMRemoveTaskWorker()
+    host = socket.gethostname()
+    owners = {
+        # expired, on a host whose processes cannot be checked
+        "expired": f"not-{host}:1:expired",
+        "dead": f"{host}:{_dead_pid()}:dead",
+        "live": f"{host}:{os.getppid()}:live",
+    }
+
+    async def main():
+        task_ids = {name: await _queued_task(a) for name in owners}
+        for name, task_id in task_ids.items():
+            await a._claim_task()
+            async with db.get_session() as session:
+                await session.execute(
+                    update(Task).where(Task.id == task_id).values(lease_owner=owners[name])
+                )
+        await _expire_lease(task_ids["expired"])
+        await b._requeue_orphaned_tasks()
+        return {name: (await _load(task_id)).lease_owner for name, task_id in task_ids.items()}
+
+    # the unexpired lease of a running process is left alone
+    assert run_db(main) == {"expired": None, "dead": None, "live": owners["live"]}
+
+
+def test_dead_owner_detection():
+    worker = WMRemoveTaskWorker()
+    host = socket.gethostname()
+    assert not worker._is_dead_owner(worker.worker_id)
+    # a previous process that had our pid, e.g. after a container restart
+    assert worker._is_dead_owner(f"{host}:{os.getpid()}:other")
+    assert worker._is_dead_owner(f"{host}:{_dead_pid()}:other")
+    assert not worker._is_dead_owner(f"{host}:{os.getppid()}:other")
+    # processes of other hosts are only requeued once their lease expires
+    assert not worker._is_dead_owner(f"not-{host}:{_dead_pid()}:other")
+    assert not worker._is_dead_owner("malformed")
+
+
+def test_lost_lease_stops_writes(run_db, monkeypatch):
+    monkeypatch.setattr(worker_module, "TASK_HEARTBEAT_SECONDS", 0)
+    a, b = WMRemoveTaskWorker(), WMRemoveTaskWorker()
+
+    async def main():
+        task_id = await _queued_task(a)
+        await a._claim_task()
+        await a._save_checkpoint(task_id, {"segment_frames": 10, "completed": [0]})
+        await _expire_lease(task_id)
+        await b._claim_task()
+
+        with pytest.raises(LeaseLost):
+            await a._save_checkpoint(task_id, {"segment_frames": 10, "completed": [0, 1]})
+        # the heartbeat notices and stops renewing
+        await asyncio.wait_for(a._heartbeat(task_id), timeout=5)
+        await a._release_lease(task_id)
+        return task_id, await _load(task_id)
+
+    task_id, task = run_db(main)
+    assert task_id in a._lost_leases
+    assert task.lease_owner == b.worker_id
+    assert json.loads(task.checkpoint)["completed"] == [0]
+
+
+def test_lost_lease_stops_the_run(run_db):
+    a, b = WMRemoveTaskWorker(), WMRemoveTaskWorker()
+
+    async def main():
+        task_id = await _queued_task(a)
+        await a._claim_task()
+        loop = asyncio.get_running_loop()
+
+        async def take_over():
+            await _expire_lease(task_id)
+            await b._claim_task()
+            # the next write of a's run notices the lost lease
+            async with db.get_session() as session:
+                with pytest.raises(LeaseLost):
+                    await a._get_owned_task(session, task_id)
+
+        class StolenRun:
+            reports = []
+
+            def run(self, input_path, output_path, progress_callback, **kwargs):
+                progress_callback(20)
+                asyncio.run_coroutine_threadsafe(take_over(), loop).result()
+                progress_callback(40)
+                self.reports.append("after takeover")
+                Path(output_path).write_bytes(b"")
+
+        sora_wm = StolenRun()
+        success = await a._process_task(sora_wm, task_id, Path("/tmp/video.mp4"))
+        return success, sora_wm.reports, await _load(task_id)
+
+    success, reports, task = run_db(main)
+    assert not success
+    assert reports == []
+    assert task.status == Status.PROCESSING
+    assert task.lease_owner == b.worker_id
+    assert task.retry_count == 0 and task.error_message is None
@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import Request
+
+from sorawm.server.upload import UploadError, UploadTooLarge, receive_upload
+
+BOUNDARY = "sorawmboundary"
+
+
+def _multipart(parts):
+    """Encode (name, filename, content) parts, filename None for plain fields."""
+    body = b""
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += (
+            f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n"
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode() + content + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def _request(body: bytes, chunk_size: int = 1000, content_length=True, content_type=None):
+    headers = [
+        (
+            b"content-type",
+            (content_type or f"multipart/form-data; boundary={BOUNDARY}").encode(),
+        )
+    ]
+    if content_length is True:
+        headers.append((b"content-length", str(len(body)).encode()))
+    elif content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": headers}
+    return Request(scope, receive)
+
+
+def _receive(request, upload_dir, **kwargs):
+    return asyncio.run(receive_upload(request, upload_dir, **kwargs))
+
+
+def test_streams_the_video_and_hashes_it(tmp_path):
+    video = bytes(range(256)) * 97
+    body = _multipart([("note", None, b"hello"), ("video", "clip.mp4", video)])
+    path, sha256 = _receive(_request(body, chunk_size=333), tmp_path)
+    assert path.read_bytes() == video
+    assert sha256 == hashlib.sha256(video).hexdigest()
+    assert path.parent == tmp_path and path.name.endswith("_clip.mp4")
+
+
+def test_filename_is_reduced_to_its_basename(tmp_path):
+    body = _multipart([("video", "../../etc/evil.mp4", b"data")])
+    path, _ = _receive(_request(body), tmp_path)
+    assert path.parent == tmp_path
+    assert path.name.endswith("_evil.mp4")
+
+
+def test_declared_size_over_the_limit_is_rejected(tmp_path):
+    body = _multipart([("video", "clip.mp4", b"x" * 100)])
+    request = _request(body, content_length=10 * 1024 * 1024)
+    with pytest.raises(UploadTooLarge) as error:
+        _receive(request, tmp_path, max_bytes=1024 * 1024)
+    assert error.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_streamed_size_over_the_limit_is_rejected(tmp_path):
+    body = _multipart([("video", "clip.mp4", b"x" * 5000)])
+    # no Content-Length, so only the bytes read can tell
+    request = _request(body, chunk_size=100, content_length=None)
+    with pytest.raises(UploadTooLarge) as error:
+        _receive(request, tmp_path, max_bytes=4000)
+    assert error.value.status_code == 413
+    # the partial file is removed
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_missing_video_field_is_rejected(tmp_path):
+    body = _multipart([("file", "clip.mp4", b"data"), ("video", None, b"not a file")])
+    with pytest.raises(UploadError) as error:
+        _receive(_request(body), tmp_path)
+    assert error.value.status_code == 400
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_truncated_body_removes_the_partial_file(tmp_path):
+    body = _multipart([("video", "clip.mp4", b"x" * 5000)])
+    with pytest.raises(UploadError):
+        _receive(_request(body[:3000], content_length=None), tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [{"content_length": "abc"}, {"content_type": "application/json"}],
+)
+def test_bad_headers_are_rejected(tmp_path, headers):
+    body = _multipart([("video", "clip.mp4", b"data")])
+    with pytest.raises(UploadError) as error:
+        _receive(_request(body, **headers), tmp_path)
+    assert error.value.status_code == 400
@@ -0,0 +1,79 @@
+import io
+import threading
+
+import numpy as np
+import pytest
+
+from sorawm.utils.video_utils import FrameBufferPool, _read_into
+
+WIDTH, HEIGHT = 4, 2
+FRAME_BYTES = WIDTH * HEIGHT * 3
+
+
+def _stream(n_frames: int, tail: int = 0) -> io.BytesIO:
+    data = b"".join(bytes([idx]) * FRAME_BYTES for idx in range(n_frames))
+    return io.BytesIO(data + b"\xff" * tail)
+
+
+def test_pool_buffers_are_recycled_not_aliased():
+    pool = FrameBufferPool(WIDTH, HEIGHT, size=2)
+    stream = _stream(4)
+    held = []
+    for _ in range(2):
+        frame = pool.acquire()
+        assert _read_into(stream, frame)
+        held.append(frame)
+    assert held[0] is not held[1]
+
+    # frame 0 is done, its buffer takes frame 2 while frame 1 is still held
+    pool.release(held[0])
+    recycled = pool.acquire()
+    assert recycled is held[0]
+    assert _read_into(stream, recycled)
+    assert (recycled == 2).all()
+    assert (held[1] == 1).all()
+
+
+def test_exhausted_pool_blocks_until_a_release():
+    pool = FrameBufferPool(WIDTH, HEIGHT, size=1)
+    frame = pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()), daemon=True)
+    waiter.start()
+    waiter.join(0.3)
+    assert waiter.is_alive() and acquired == []
+
+    pool.release(frame)
+    waiter.join(5)
+    assert acquired == [frame]
+
+
+def test_close_fails_a_blocked_acquire():
+    pool = FrameBufferPool(WIDTH, HEIGHT, size=1)
+    pool.acquire()
+    errors = []
+
+    def acquire():
+        try:
+            pool.acquire()
+        except RuntimeError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=acquire, daemon=True)
+    waiter.start()
+    pool.close()
+    waiter.join(5)
+    assert not waiter.is_alive() and len(errors) == 1
+
+
+def test_foreign_frames_are_rejected():
+    pool = FrameBufferPool(WIDTH, HEIGHT, size=1)
+    with pytest.raises(ValueError):
+        pool.release(np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8))
+
+
+def test_read_into_drops_a_partial_frame():
+    stream = _stream(1, tail=FRAME_BYTES // 2)
+    buffer = np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    assert _read_into(stream, buffer)
+    assert not _read_into(stream, buffer)